@@ -0,0 +1,204 @@
+from utils.args import benchmark_args
+from objects.bresenham import BresenhamPath
+from objects.track import Track
+from objects.car import Car
+from objects.driver import Driver
+from objects.random_stream import RandomStream, spawn_streams
+import json
+import os
+import random
+import sys
+import timeit
+
+# A start and end position in each of the 8 octants around the start, for BresenhamPath
+OCTANTS = [
+    ((10, 10), (15, 12)), ((10, 10), (12, 15)), ((10, 10), (8, 15)), ((10, 10), (5, 12)),
+    ((10, 10), (5, 8)), ((10, 10), (8, 5)), ((10, 10), (12, 5)), ((10, 10), (15, 8))
+]
+
+
+def benchmark():
+    """
+    Benchmark function to time the hot paths of the track, car and driver and compare them against a stored baseline
+
+    Each metric is the best time of several repeats, in seconds per call. The results are saved as the baseline if there
+        is no baseline yet or when asked to. Otherwise every metric is compared against the baseline, and the benchmark
+        exits with an error if any metric is slower than the baseline by more than the threshold. See
+        utils.args.benchmark_args for the arguments
+    """
+    # Parse arguments
+    arguments = benchmark_args()
+
+    # Time every metric
+    metrics = {}
+    metrics.update(time_bresenham(arguments.repeat))
+    metrics.update(time_track(arguments.repeat))
+    metrics.update(time_car(arguments.repeat))
+    metrics.update(time_value_iteration(arguments.repeat))
+    metrics.update(time_episodes(arguments.repeat))
+
+    # Save a new baseline
+    if arguments.save or not os.path.exists(arguments.baseline):
+        with open(arguments.baseline, 'w') as file:
+            json.dump(metrics, file, indent=4, sort_keys=True)
+
+        for name, seconds in metrics.items():
+            print(f'{name}: {seconds * 1e6:.2f} us')
+        print(f'Saved baseline to {arguments.baseline}')
+        return
+
+    # Compare against the baseline
+    with open(arguments.baseline, 'r') as file:
+        baseline = json.load(file)
+
+    regressions = []
+    for name, seconds in metrics.items():
+        if name not in baseline:
+            print(f'{name}: {seconds * 1e6:.2f} us, not in baseline')
+            continue
+
+        ratio = seconds / baseline[name]
+        print(f'{name}: {seconds * 1e6:.2f} us, {ratio:.2f}x baseline')
+        if ratio > 1 + arguments.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f'Regressed past {arguments.threshold:.0%}: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+def time_call(function, number, repeat, setup=None):
+    """
+    Function to time a callable with timeit
+
+    Args:
+        function: callable, function to time, called without arguments
+        number: int, number of calls per repeat
+        repeat: int, number of repeats, the best one is kept
+        setup: callable, optional function called before each repeat, not timed
+
+    Returns:
+        seconds: float, best time of a single call in seconds
+    """
+    times = timeit.repeat(function, setup=setup if setup is not None else 'pass', number=number, repeat=repeat)
+    return min(times) / number
+
+
+def time_bresenham(repeat):
+    """
+    Function to time BresenhamPath in each of the 8 octants
+
+    Args:
+        repeat: int, number of repeats of each metric
+
+    Returns:
+        metrics: dict, seconds per path keyed by metric name
+    """
+    metrics = {}
+    for octant, (last_position, new_position) in enumerate(OCTANTS):
+        metrics[f'bresenham_octant_{octant}'] = time_call(lambda: BresenhamPath(last_position, new_position), 10000,
+                                                          repeat)
+    return metrics
+
+
+def time_track(repeat):
+    """
+    Function to time Track.get_track_position over every position of the R track
+
+    Args:
+        repeat: int, number of repeats of each metric
+
+    Returns:
+        metrics: dict, seconds per lookup keyed by metric name
+    """
+    track = Track('R')
+    positions = [(x, y) for x in range(track.x) for y in range(track.y)]
+
+    def lookup():
+        for position in positions:
+            track.get_track_position(position)
+
+    return {'track_get_track_position': time_call(lookup, 10, repeat) / len(positions)}
+
+
+def time_car(repeat, steps=1000):
+    """
+    Function to time Car.accelerate with tracing off, driving a seeded car with random accelerations on each track. The
+        car is put back on the start line before each repeat
+
+    Args:
+        repeat: int, number of repeats of each metric
+        steps: int, number of steps per repeat
+
+    Returns:
+        metrics: dict, seconds per step keyed by metric name
+    """
+    metrics = {}
+    for track_name in ['R', 'O', 'L']:
+        car = Car(Track(track_name), rng=RandomStream(0))
+        accelerations = [(x, y) for x in [-1, 0, 1] for y in [-1, 0, 1]]
+        rng = random.Random(1)
+        choices = [rng.choice(accelerations) for _ in range(steps)]
+
+        def drive():
+            for acceleration in choices:
+                if car.get_finish():
+                    car.restart()
+                car.accelerate(acceleration)
+
+        metrics[f'car_accelerate_{track_name}'] = time_call(drive, 1, repeat, car.restart) / steps
+    return metrics
+
+
+def time_value_iteration(repeat):
+    """
+    Function to time Driver.value_iteration with each engine on each track, starting from a zero value matrix and
+        from the finish distances
+
+    Args:
+        repeat: int, number of repeats of each metric
+
+    Returns:
+        metrics: dict, seconds per value iteration keyed by metric name
+    """
+    metrics = {}
+    for track_name in ['R', 'O', 'L']:
+        for value_engine in ['numpy', 'loop', 'priority']:
+            for value_init in ['zeros', 'distance']:
+                driver = Driver(Car(Track(track_name), rng=RandomStream(0)), value_engine=value_engine,
+                                value_init=value_init)
+
+                def reset():
+                    driver.values = driver.get_initial_values().tolist()
+
+                suffix = '_distance' if value_init == 'distance' else ''
+                name = f'value_iteration_{value_engine}_{track_name}{suffix}'
+                metrics[name] = time_call(driver.value_iteration, 1, repeat, reset)
+    return metrics
+
+
+def time_episodes(repeat):
+    """
+    Function to time full seeded episodes on each track, from loading the track until the car finishes
+
+    Args:
+        repeat: int, number of repeats of each metric
+
+    Returns:
+        metrics: dict, seconds per episode keyed by metric name
+    """
+    metrics = {}
+    for track_name in ['R', 'O', 'L']:
+        def episode():
+            car_stream, driver_stream = spawn_streams(1)
+            car = Car(Track(track_name), rng=car_stream)
+            driver = Driver(car, rng=driver_stream)
+            while not car.get_finish():
+                driver.accelerate_car()
+
+        metrics[f'episode_{track_name}'] = time_call(episode, 1, repeat)
+    return metrics
+
+
+if __name__ == '__main__':
+    benchmark()
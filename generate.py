@@ -0,0 +1,23 @@
+from utils.args import generate_args
+from objects.track_generator import generate_track, write_track
+import random
+
+
+def generate():
+    """
+    Generate function to write a random winding track to data, in the same format as the R, O and L tracks
+
+    The track can then be used by name with every other script, for example python main.py -t <track_name>. See
+        utils.args.generate_args for the arguments
+    """
+    # Parse arguments
+    arguments = generate_args()
+
+    # Generate and write the track
+    grid = generate_track(arguments.rows, arguments.columns, arguments.corridor_width, arguments.turns,
+                          random.Random(arguments.random_seed))
+    write_track(f'data//{arguments.track_name}-track.txt', grid)
+
+
+if __name__ == '__main__':
+    generate()
@@ -2,7 +2,13 @@ from utils.args import args
 from objects.track import Track
 from objects.car import Car
 from objects.driver import Driver
-from random import seed
+from objects.tracer import Tracer
+from objects.metrics import Metrics
+from objects.random_stream import spawn_streams
+from objects.recorder import Recorder
+from objects.value_cache import ValueCache
+from objects.watchdog import Watchdog
+import sys
 
 
 def main():
@@ -11,7 +17,7 @@ def main():
 
     Arguments:
         -rs <int>, --random_seed <int>
-            Random seed for testing, seeds the rate of failed accelerations
+            Random seed for testing, seeds the random number streams of the car and driver
         -t <char>, --track_name <char>
             Track letter to use as the track. Please use: 'R', 'O', or 'L'. Capitalization matters
             <R> r-track
@@ -22,20 +28,85 @@ def main():
             <S> stop, resets velocity, increases time, but doesn't move car
             <R> reset, resets velocity, increases time, moves car back to start
         -bt <char>, --brain_type <char>
-            Learning type, Q = QLearning, S = SARSA. Please use: 'Q', 'S'. Capitalization matters
+            Learning type, Q = QLearning, S = SARSA, D = DynaQ, P = Planner. Please use: 'Q', 'S', 'D', 'P'.
+            Capitalization matters
             <Q> QLearning
             <S> SARSA
+            <D> DynaQ, QLearning with prioritized sweeping over the observed transitions
+            <P> Planner, the best action of value iteration over every (x, y, vx, vy) state, no learning
         -dr <float>, --discount_rate <float>
             Discount rate in Bellman's equation for value iteration
         -cd <float>, --convergence_delta <float>
             Convergence delta for value iteration
+        -lr <float>, --learning_rate <float>
+            Rate of learning for Reinforcement learning
+        -ps <int>, --planning_steps <int>
+            Number of simulated updates from the model after each step, for DynaQ
+        -ve <str>, --value_engine <str>
+            Value iteration engine. Please use: 'numpy', 'loop', 'priority'
+            <numpy> vectorized sweeps over the whole track
+            <loop> cell by cell loop
+            <priority> prioritized backups spreading out from the finish line
+        -vi <str>, --value_init <str>
+            Starting values of value iteration. Please use: 'zeros', 'distance'
+            <zeros> 0 everywhere
+            <distance> the discounted step distance of every position from the finish line
+        -vc <str>, --value_cache <str>
+            Directory to cache converged value matrices in, value iteration is skipped when the matrix is cached
+        -tl <int>, --trace_level <int>
+            Trace level for the car. Please use: 0, 1, 2
+            <0> off
+            <1> a line per step
+            <2> a line per step, including the positions and track types passed over
+        -ts <int>, --trace_steps <int>
+            Number of the most recent traced steps to keep in memory for crash debugging
+        -tf <str>, --trace_file <str>
+            File to write every traced step to
+        -mf <str>, --metrics_file <str>
+            File to write a snapshot of the runtime metrics to when the run ends
+        -mt <str>, --metrics_format <str>
+            Format of the metrics snapshot. Please use: 'json', 'prometheus'
+        -ms <int>, --metrics_steps <int>
+            Number of steps between metrics snapshots while driving. Defaults to 0, only at the end
+        -rc <str>, --record_directory <str>
+            Directory to save the trajectory of the run to, a .npy file per field
+        -re, --record_delta
+            Delta encode the time and positions of the saved trajectory
+        -rf <str>, --results_file <str>
+            SQLite database to add the result of the run to
+        -sb <int>, --step_budget <int>
+            Number of steps after which the run is stopped with the status step_budget
+        -tb <float>, --time_budget <float>
+            Seconds of driving after which the run is stopped with the status time_budget
+        -sw <int>, --stall_window <int>
+            Number of recent steps to look for a stall in, the run is stopped with the status stalled. Defaults to 0,
+            off
+        -ss <int>, --stall_states <int>
+            The car is stalled when its last stall_window steps visited this many distinct states or fewer
     """
     # Parse arguments
     arguments = args()
 
-    # Set seed
-    if arguments.random_seed:
-        seed(arguments.random_seed)
+    # Drive
+    driver = run(arguments)
+
+    # Save Data
+    driver.summarize(arguments.random_seed, arguments.results_file)
+
+
+def run(arguments, values=None):
+    """
+    Function to create a track, car and driver from the parsed arguments and drive the car until it finishes
+
+    Args:
+        arguments: namespace, parsed arguments, see main
+        values: numpy float array (x, y), optional converged value matrix for the driver, skips value iteration
+
+    Returns:
+        driver: Driver, driver of the finished car
+    """
+    # Independent random number streams for the car and driver, derived from the seed alone
+    car_stream, driver_stream = spawn_streams(arguments.random_seed)
 
     # Create Track
     kwargs = {
@@ -43,10 +114,25 @@ def main():
     }
     track = Track(**kwargs)
 
+    # Create Tracer
+    kwargs = {
+        'level': arguments.trace_level,
+        'buffer_steps': arguments.trace_steps,
+        'file_location': arguments.trace_file
+    }
+    tracer = Tracer(**kwargs)
+
+    # Create Recorder
+    recorder = Recorder() if arguments.record_directory else None
+
     # Create Car
     kwargs = {
         'track': track,
-        'reset_type': arguments.reset_type
+        'reset_type': arguments.reset_type,
+        'tracer': tracer,
+        'rng': car_stream,
+        'recorder': recorder,
+        'max_steps': arguments.step_budget
     }
     car = Car(**kwargs)
 
@@ -56,16 +142,64 @@ def main():
         'brain_type': arguments.brain_type,
         'discount_rate': arguments.discount_rate,
         'convergence_delta': arguments.convergence_delta,
-        'learning_rate': arguments.learning_rate
+        'learning_rate': arguments.learning_rate,
+        'planning_steps': arguments.planning_steps,
+        'value_engine': arguments.value_engine,
+        'value_init': arguments.value_init,
+        'values': values,
+        'value_cache': ValueCache(arguments.value_cache) if arguments.value_cache else None,
+        'rng': driver_stream
     }
     driver = Driver(**kwargs)
 
-    # Drive
-    while not car.get_finish():
-        driver.accelerate_car()
+    # Create Metrics
+    kwargs = {
+        'car': car,
+        'driver': driver,
+        'file_location': arguments.metrics_file,
+        'file_format': arguments.metrics_format
+    }
+    metrics = Metrics(**kwargs)
 
-    # Save Data
-    driver.summarize(arguments.random_seed)
+    # Create Watchdog, stops the run early when it is over its time budget or stalled
+    kwargs = {
+        'car': car,
+        'max_seconds': arguments.time_budget,
+        'stall_window': arguments.stall_window,
+        'stall_states': arguments.stall_states
+    }
+    watchdog = Watchdog(**kwargs)
+
+    # Step of the next metrics snapshot while driving, never reached if there are none
+    metrics_step = arguments.metrics_steps if arguments.metrics_file and arguments.metrics_steps > 0 else -1
+
+    # Drive, on an error print the last traced steps before raising
+    metrics.start_driving()
+    watchdog.start()
+    try:
+        while not car.get_finish():
+            driver.accelerate_car()
+            watchdog.check()
+
+            if car.time == metrics_step:
+                metrics.dump()
+                metrics_step += arguments.metrics_steps
+    except Exception:
+        for step in tracer.get_steps():
+            print(step, file=sys.stderr)
+        raise
+    finally:
+        metrics.stop_driving()
+        tracer.close()
+
+    # Final metrics snapshot
+    metrics.dump()
+
+    # Save the trajectory
+    if recorder is not None:
+        recorder.save(arguments.record_directory, arguments.record_delta)
+
+    return driver
 
 
 if __name__ == '__main__':
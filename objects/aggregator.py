@@ -0,0 +1,224 @@
+from math import ceil, log, sqrt
+
+
+class RunningStats:
+    """
+    Class RunningStats which summarizes a stream of finish times without keeping them
+
+    The count, mean and sum of squared differences from the mean are updated with Welford's method, alongside the
+        minimum and maximum. Quantiles come from a sketch of log spaced buckets, each value counted in the bucket of its
+        logarithm, so any quantile is within the relative accuracy of the true one. Two summaries merge exactly, as the
+        moments combine with Chan's formula and the buckets add up, so summaries from parallel workers can be combined
+        in any order.
+    """
+    def __init__(self, relative_accuracy=.01):
+        """
+        Init function, takes the relative accuracy of the quantiles
+
+        Args:
+            relative_accuracy: float, relative error of any quantile. Defaults to .01
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = log(self.gamma)
+
+        # Welford moments and bounds
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.minimum = None
+        self.maximum = None
+
+        # Quantile sketch, count of each bucket keyed by index, and the count of values of 0 or below
+        self.buckets = {}
+        self.zero_count = 0
+
+    def add(self, value):
+        """
+        This function adds a value to the summary
+
+        Args:
+            value: float, value to add, a finish time
+        """
+        # Moments
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        # Bounds
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        # Sketch
+        if value <= 0:
+            self.zero_count += 1
+        else:
+            index = ceil(log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        """
+        This function adds another summary into this one, as if its values were added here
+
+        Args:
+            other: RunningStats, summary with the same relative accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('RunningStats relative accuracies do not match, summaries only merge at the same accuracy')
+        if other.count == 0:
+            return
+
+        # Moments
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+        # Bounds
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+
+        # Sketch
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+        self.zero_count += other.zero_count
+
+    def get_variance(self):
+        """
+        This function returns the sample variance of the values
+
+        Returns:
+            variance: float, sample variance, 0 with fewer than 2 values
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.
+
+    def get_standard_deviation(self):
+        """
+        This function returns the sample standard deviation of the values
+
+        Returns:
+            standard_deviation: float, sample standard deviation, 0 with fewer than 2 values
+        """
+        return sqrt(self.get_variance())
+
+    def get_quantile(self, quantile):
+        """
+        This function returns an estimate of a quantile of the values from the sketch, by nearest rank. The quantile is
+            the smallest value with at least that fraction of the values at or below it, so a high quantile of a few
+            values is the largest of them rather than the smallest
+
+        Args:
+            quantile: float, quantile between 0 and 1, for example .5 for the median
+
+        Returns:
+            value: float, estimate within the relative accuracy of the quantile, or None without values
+        """
+        if self.count == 0:
+            return None
+
+        # Walk the buckets in order until reaching the rank of the quantile, rounded up. The product is rounded first so
+        # that, for example, .9 of 10 values is rank 9 and not 10
+        rank = max(1, ceil(round(quantile * self.count, 9)))
+        seen = self.zero_count
+        if seen >= rank:
+            return self.minimum
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Middle of the bucket in relative terms, kept within the bounds seen
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.minimum), self.maximum)
+
+        return self.maximum
+
+    def to_dict(self):
+        """
+        This function returns the summary as a dict that can be saved as json
+
+        Returns:
+            summary: dict, the relative accuracy, moments, bounds and sketch
+        """
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'buckets': {str(index): bucket_count for index, bucket_count in self.buckets.items()},
+            'zero_count': self.zero_count
+        }
+
+    @classmethod
+    def from_dict(cls, summary):
+        """
+        This function creates a summary from a dict returned by to_dict
+
+        Args:
+            summary: dict, the relative accuracy, moments, bounds and sketch
+
+        Returns:
+            running_stats: RunningStats, the summary
+        """
+        running_stats = cls(summary['relative_accuracy'])
+        running_stats.count = summary['count']
+        running_stats.mean = summary['mean']
+        running_stats.m2 = summary['m2']
+        running_stats.minimum = summary['minimum']
+        running_stats.maximum = summary['maximum']
+        running_stats.buckets = {int(index): bucket_count for index, bucket_count in summary['buckets'].items()}
+        running_stats.zero_count = summary['zero_count']
+        return running_stats
+
+
+class Aggregator:
+    """
+    Class Aggregator which keeps a RunningStats of the finish times of each configuration
+
+    A configuration is the track name, reset type, brain type and learning rate of a run. Only runs that reached the
+        finish line are added, as the time of a run stopped early is not a finish time. Aggregators built from separate
+        streams of runs, for example by parallel workers, merge into one.
+    """
+    def __init__(self, relative_accuracy=.01):
+        """
+        Init function, takes the relative accuracy of the quantiles
+
+        Args:
+            relative_accuracy: float, relative error of any quantile. Defaults to .01
+        """
+        self.relative_accuracy = relative_accuracy
+        self.configurations = {}
+
+    def add(self, row):
+        """
+        This function adds the finish time of a run to its configuration, if the run finished
+
+        Args:
+            row: tuple, row returned by Driver.get_summary
+        """
+        if row[7] != 'finished':
+            return
+
+        configuration = (row[1], row[2], row[3], row[4])
+        if configuration not in self.configurations:
+            self.configurations[configuration] = RunningStats(self.relative_accuracy)
+        self.configurations[configuration].add(row[6])
+
+    def merge(self, other):
+        """
+        This function adds another aggregator into this one
+
+        Args:
+            other: Aggregator, aggregator with the same relative accuracy
+        """
+        for configuration, running_stats in other.configurations.items():
+            if configuration not in self.configurations:
+                self.configurations[configuration] = RunningStats(self.relative_accuracy)
+            self.configurations[configuration].merge(running_stats)
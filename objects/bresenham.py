@@ -3,14 +3,12 @@ class BresenhamPath:
     Python 3 program for Bresenham’s Line Generation. Modified from the following source by ash264:
         https://www.geeksforgeeks.org/bresenhams-line-generation-algorithm/
 
-    This class implements different path algorithms depending on direction of the slope and returns the positions
-        traveled between a start and end position
+    This class returns the positions traveled between a start and end position, walked by walk_path
     """
     def __init__(self, last_position, new_position):
         """
-        Init function, takes two positional tuples determines the slope between them and then adds a list of the
-            positional tuples between them to this object. There are 6 Bresenham's Line Generation to choose from
-            depending on the magnitude and direction of the slope
+        Init function, takes two positional tuples and adds a list of the positional tuples between them to this
+            object
 
         Args:
             last_position: tuple (int, int), starting position before movement
@@ -20,311 +18,107 @@ class BresenhamPath:
         self.last_position = last_position
         self.new_position = new_position
 
-        # Calculation of slope. If x delta or y delta = 0 hard code the slope to some positive number around 1
-        # If y delta = 0, then set slope to less than 1 to trigger positive slope path calculation
-        if last_position[1] - new_position[1] == 0:
-            slope = .75
-        # If x delta = 0, then set slope to greater than 1 to trigger positive slope path calculation
-        elif last_position[0] - new_position[0] == 0:
-            slope = 1.75
-        # Otherwise, proceed with normal slope calculation
-        else:
-            slope = (last_position[1] - new_position[1]) / (last_position[0] - new_position[0])
+        # Walk the path
+        self.positions = list(walk_path(last_position, new_position))
 
-        # Handler for grabbing the correct bresenhams algorithm depending on direction of slope
-        # Positive slopes
-        # y > x
-        if slope > 1:
-            self.positions = self.calculate_bresenhams_algorithm_1()
-        # x > y
-        elif 0 < slope < 1:
-            self.positions = self.calculate_bresenhams_algorithm_2()
-
-        # Negative slopes
-        # x > y
-        elif -1 < slope < 0:
-            self.positions = self.calculate_bresenhams_algorithm_3()
-        # y > x
-        elif slope < -1:
-            self.positions = self.calculate_bresenhams_algorithm_4()
-
-        # Edge cases
-        # Slope is positive x = y
-        elif slope == 1:
-            self.positions = self.calculate_bresenhams_algorithm_5()
-        # Slope is negative x = y
-        elif slope == -1:
-            self.positions = self.calculate_bresenhams_algorithm_6()
-
-    def calculate_bresenhams_algorithm_1(self):
-        """
-        Function to calculate bresenhams with a positive slope where y is increasing faster
-
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
-
-        if self.last_position[1] > self.new_position[1]:
-            start = self.new_position
-            end = self.last_position
-
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
-
-        # List for storing the positions passed through, add start
-        positions = [start]
-
-        # Functions for line generation
-        m_new = 2 * (x2 - x1)
-        slope_error_new = m_new - (y2 - y1)
-
-        # Generate path, skipping start
-        x = x1
-        for y in range(y1 + 1, y2 + 1):
-            # Save the position
-            positions.append((x, y))
-
-            # Add slope to increment angle formed
-            slope_error_new += m_new
-
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                x += 1
-                slope_error_new = slope_error_new - 2 * (y2 - y1)
-
-        return positions
-
-    def calculate_bresenhams_algorithm_2(self):
-        """
-        Function to calculate bresenhams with a positive slope where x is increasing faster
-
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
-
-        if self.last_position[0] > self.new_position[0]:
-            start = self.new_position
-            end = self.last_position
-
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
-
-        # List for storing the positions passed through, add start
-        positions = [start]
-
-        # Functions for line generation
-        m_new = 2 * (y2 - y1)
-        slope_error_new = m_new - (x2 - x1)
-
-        # Generate path, skipping start
-        y = y1
-        for x in range(x1 + 1, x2 + 1):
-            # Save the position
-            positions.append((x, y))
-
-            # Add slope to increment angle formed
-            slope_error_new += m_new
-
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                y += 1
-                slope_error_new = slope_error_new - 2 * (x2 - x1)
-
-        return positions
-
-    def calculate_bresenhams_algorithm_3(self):
-        """
-        Function to calculate bresenhams with a negative slope where x is increasing faster
-
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
-
-        if self.last_position[0] > self.new_position[0]:
-            start = self.new_position
-            end = self.last_position
-
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
-
-        # List for storing the positions passed through, add start
-        positions = [start]
-
-        # Functions for line generation
-        m_new = 2 * (y1 - y2)
-        slope_error_new = m_new - (x2 - x1)
-
-        # Generate path, skipping start
-        y = y1
-        for x in range(x1 + 1, x2 + 1):
-            # Save the position
-            positions.append((x, y))
-
-            # Add slope to increment angle formed
-            slope_error_new += m_new
-
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                y -= 1
-                slope_error_new = slope_error_new - 2 * (x2 - x1)
-
-        return positions
-
-    def calculate_bresenhams_algorithm_4(self):
-        """
-        Function to calculate bresenhams with a negative slope where x is increasing faster
-
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
-
-        if self.last_position[1] > self.new_position[1]:
-            start = self.new_position
-            end = self.last_position
-
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
-
-        # List for storing the positions passed through, add start
-        positions = [start]
-
-        # Functions for line generation
-        m_new = 2 * (x1 - x2)
-        slope_error_new = m_new - (y2 - y1)
-
-        # Generate path, skipping start
-        x = x1
-        for y in range(y1 + 1, y2 + 1):
-            # Save the position
-            positions.append((x, y))
-
-            # Add slope to increment angle formed
-            slope_error_new += m_new
-
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                x -= 1
-                slope_error_new = slope_error_new - 2 * (y2 - y1)
-
-        return positions
-
-    def calculate_bresenhams_algorithm_5(self):
+    def get_positions(self):
         """
-        Function to calculate bresenhams with a positive slope where x = y
+        Function for returning the list of position between start and end for this object
 
         Returns:
             track_positions: list tuple (int, int), a list of the track positions passed through
         """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
-
-        if self.last_position[0] > self.new_position[0]:
-            start = self.new_position
-            end = self.last_position
-
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
-
-        # List for storing the positions passed through, don't append start here
-        positions = []
-
-        # Functions for line generation
-        m_new = 2 * (y2 - y1)
-        slope_error_new = m_new - (x2 - x1)
-
-        # Generate path, starting from start
-        y = y1
-        for x in range(x1, x2 + 1):
-            # Save the position
-            positions.append((x, y))
-
-            # Add slope to increment angle formed
-            slope_error_new += m_new
-
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                y += 1
-                slope_error_new = slope_error_new - 2 * (x2 - x1)
+        return self.positions
 
-        return positions
 
-    def calculate_bresenhams_algorithm_6(self):
-        """
-        Function to calculate bresenhams with a negative slope where x = y
-
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        # Define start and end, swap if needed
-        start = self.last_position
-        end = self.new_position
+def walk_path(last_position, new_position):
+    """
+    Generator for the positions traveled between a start and end position, a single integer Bresenham line for every
+        direction
 
-        if self.last_position[0] > self.new_position[0]:
-            start = self.new_position
-            end = self.last_position
+    The line steps one cell at a time along the major axis, the axis with the larger delta, and steps the minor axis
+        whenever the error term passes 0. The walk always runs up the major axis, so it starts from whichever end has
+        the smaller major coordinate, which is the new position for some directions. Diagonal lines step both axes
+        together from the first cell. Straight lines and a zero move walk along x unless only y changes. Being a
+        generator, a caller can stop as soon as it has seen enough of the path.
 
-        # Assign x and y to match algorithm
-        x1 = start[0]
-        y1 = start[1]
-        x2 = end[0]
-        y2 = end[1]
+    Args:
+        last_position: tuple (int, int), starting position before movement
+        new_position: tuple (int, int), end position after applying velocity changes
 
-        # List for storing the positions passed through, don't append start here
-        positions = []
+    Yields:
+        position: tuple (int, int), the next track position passed through
+    """
+    delta_x = new_position[0] - last_position[0]
+    delta_y = new_position[1] - last_position[1]
+
+    # y is the major axis when it changes more, or is the only axis that changes
+    major_y = abs(delta_y) > abs(delta_x) or (delta_x == 0 and delta_y != 0)
+    diagonal = delta_x != 0 and abs(delta_x) == abs(delta_y)
+
+    # Walk up the major axis, swapping start and end if needed
+    start = last_position
+    end = new_position
+    if (delta_y < 0) if major_y else (delta_x < 0):
+        start = new_position
+        end = last_position
+
+    # Assign major and minor coordinates
+    if major_y:
+        major, minor = start[1], start[0]
+        major_delta, minor_delta = end[1] - start[1], end[0] - start[0]
+    else:
+        major, minor = start[0], start[1]
+        major_delta, minor_delta = end[0] - start[0], end[1] - start[1]
+    minor_step = 1 if minor_delta > 0 else -1
+
+    # Error term for line generation
+    m_new = 2 * abs(minor_delta)
+    slope_error_new = m_new - major_delta
+
+    # Start, a diagonal steps the minor axis straight away
+    yield start
+    if diagonal:
+        minor += minor_step
+        slope_error_new -= major_delta
+
+    # Generate path, skipping start
+    for major in range(major + 1, major + major_delta + 1):
+        # Save the position
+        yield (minor, major) if major_y else (major, minor)
+
+        # Add slope to increment angle formed
+        slope_error_new += m_new
+
+        # Slope error reached limit, time to step the minor axis and update slope error
+        if slope_error_new >= 0:
+            minor += minor_step
+            slope_error_new -= 2 * major_delta
+
+
+def get_path(last_position, new_position):
+    """
+    Function for returning the positions traveled between a start and end position without creating a BresenhamPath
 
-        # Functions for line generation
-        m_new = 2 * (y1 - y2)
-        slope_error_new = m_new - (x2 - x1)
+    The path only depends on the displacement between the two positions, so for displacements within the velocity
+        bounds the cached offsets are shifted by the start position. Any other displacement falls back to walk_path.
 
-        # Generate path, starting from start
-        y = y1
-        for x in range(x1, x2 + 1):
-            # Save the position
-            positions.append((x, y))
+    Args:
+        last_position: tuple (int, int), starting position before movement
+        new_position: tuple (int, int), end position after applying velocity changes
 
-            # Add slope to increment angle formed
-            slope_error_new += m_new
+    Returns:
+        track_positions: list tuple (int, int), a list of the track positions passed through
+    """
+    offsets = OFFSET_PATHS.get((new_position[0] - last_position[0], new_position[1] - last_position[1]))
 
-            # Slope error reached limit, time to increment y and update slope error.
-            if slope_error_new >= 0:
-                y -= 1
-                slope_error_new = slope_error_new - 2 * (x2 - x1)
+    # Displacement beyond the velocity bounds, walk the path
+    if offsets is None:
+        return list(walk_path(last_position, new_position))
 
-        return positions
+    return [(last_position[0] + offset_x, last_position[1] + offset_y) for offset_x, offset_y in offsets]
 
-    def get_positions(self):
-        """
-        Function for returning the list of position between start and end for this object
 
-        Returns:
-            track_positions: list tuple (int, int), a list of the track positions passed through
-        """
-        return self.positions
+# Relative paths for every displacement the car can make with its velocity bounded to [-5, 5], keyed by (dx, dy)
+OFFSET_PATHS = {(dx, dy): tuple(walk_path((0, 0), (dx, dy)))
+                for dx in range(-5, 6) for dy in range(-5, 6)}
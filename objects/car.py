@@ -1,5 +1,7 @@
-from random import randint
-from objects.bresenham import BresenhamPath
+from objects.bresenham import get_path
+from objects.movement import check_path
+from objects.random_stream import RandomStream
+from objects.tracer import Tracer
 
 
 class Car:
@@ -8,7 +10,7 @@ class Car:
         and new position are calculated. This object also handles communication between the Bresenham's line algorithm
         and the track
     """
-    def __init__(self, track, reset_type='S'):
+    def __init__(self, track, reset_type='S', tracer=None, rng=None, recorder=None, max_steps=200000):
         """
         Init function, takes a track and a reset_type. Retrieves a start position from the track and then awaits
             acceleration commands. Car starts at the start position.
@@ -17,21 +19,40 @@ class Car:
             track: track, track object with a track read in from data
             reset_type: char, defines the rest type. Default is 'S', which stops the car, sets velocity to (0, 0), and
                 increments time by 1. Use 'R' to have a hard rest to the start position
+            tracer: Tracer, optional tracer to record each step. Defaults to a disabled tracer
+            rng: RandomStream, optional random number stream for the start position and the failed accelerations.
+                Defaults to a new stream seeded from the operating system
+            recorder: Recorder, optional recorder to keep the trajectory of every step. Defaults to none
+            max_steps: int, step budget of an episode, the car stops once its time reaches it. Defaults to 200000
         """
         # Track
         self.track = track
 
+        # Tracer for debugging, off unless one is passed
+        self.tracer = tracer if tracer is not None else Tracer()
+
+        # Trajectory recorder, none unless one is passed
+        self.recorder = recorder
+
         # Car meta variables - reset type
         if reset_type not in ['S', 'R']:
             raise ValueError("Car Reset type not found, Please specify 'S' or 'R'")
         else:
             self.reset_type = reset_type
 
-        # Car meta variables - flag finished
+        # Random number stream, owned by this car
+        self.rng = rng if rng is not None else RandomStream()
+
+        # Car meta variables - flag finished, and flag crashed on the last step
         self.flag_finished = False
+        self.flag_crashed = False
+
+        # Budget of the episode, and the status the car was stopped with early, see stop
+        self.max_steps = max_steps
+        self.stop_status = None
 
         # Position variables for start and current. Resets to start if reset is 'R'
-        self.start_position = self.track.get_start_position()
+        self.start_position = self.track.get_start_position(self.rng)
         self.position = self.start_position
         self.track_position = track.get_track_position(self.position)
 
@@ -45,6 +66,13 @@ class Car:
         self.acceleration = (0, 0)
         self.acceleration_status = (True, True)
 
+        # Counters over every episode of this car, see objects.metrics
+        self.steps = 0
+        self.crashes = 0
+        self.resets = 0
+        self.acceleration_failures = 0
+        self.cells_checked = 0
+
     def accelerate(self, acceleration):
         """
         Accelerate function. Main function for driving the car
@@ -68,11 +96,12 @@ class Car:
 
         # Check to make sure this isn't a break command (sign of velocity differs from the sign of acceleration = break)
         if (acceleration_x * self.velocity[0] >= 0) & acceleration_x != 0:
-            # Roll an int between 0 and 4, 0 is a failure (20%)
-            if randint(0, 4) == 0:
+            # Roll for a failure (20%), the next roll of the block
+            if self.rng.roll_failure():
                 # If failed, update status and set acceleration to 0
                 acceleration_x = 0
                 acceleration_status_x = False
+                self.acceleration_failures += 1
 
         # y acceleration
         # Check bounds and convert if needed
@@ -83,23 +112,24 @@ class Car:
 
         # Check to make sure this isn't a break command (sign of velocity differs from the sign of acceleration = break)
         if (acceleration_y * self.velocity[1] >= 0) & acceleration_y != 0:
-            # Roll an int between 0 and 4, 0 is a failure (20%)
-            if randint(0, 4) == 0:
+            # Roll for a failure (20%), the next roll of the block
+            if self.rng.roll_failure():
                 # If failed, update status and set acceleration to 0
                 acceleration_y = 0
                 acceleration_status_y = False
+                self.acceleration_failures += 1
 
         # Save acceleration results and the status
         self.acceleration = (acceleration_x, acceleration_y)
         self.acceleration_status = (acceleration_status_x, acceleration_status_y)
 
-        print('-------------')
-        print(f'Acceleration: {self.acceleration}')
-        print(f'Status: {self.acceleration_status}')
-
         # Update velocity
         self.update_velocity()
 
+        # Record the step
+        if self.recorder is not None:
+            self.recorder.record(self, acceleration)
+
     def check_acceleration_bounds(self, acceleration_value):
         """
         This function ensures that the input to acceleration match the desired range. Any positive numbers are converted
@@ -158,8 +188,6 @@ class Car:
         # Save the results
         self.velocity = (velocity_x, velocity_y)
 
-        print(f'Velocity: {self.velocity}')
-
         # Call to update_position
         self.update_position()
 
@@ -167,9 +195,9 @@ class Car:
         """
         Update position function to handle car movement on track
 
-        This function takes the results of the velocity to update movement. The path is then calculated by creating
-            a BresenhamPath object. The path is checked for any collisions before movement occurs. If any collisions
-            occurs, the car is stopped and reset based on the reset type.
+        This function takes the results of the velocity to update movement. The path along the Bresenham line is
+            checked for any collisions before movement occurs, see check_movement. If any collisions occurs, the car is
+            stopped and reset based on the reset type.
 
         Returns:
             flag_finished: Boolean, if the finish line has passed
@@ -194,37 +222,39 @@ class Car:
         # Retrieve flags based on crash and finish status
         flag_crashed, flag_finished = self.check_movement(new_position)
         self.flag_finished = flag_finished
-        print(f'Crashed: {flag_crashed}, Finished: {flag_finished}')
+        self.flag_crashed = flag_crashed
 
         # Increment time
         self.time += 1
-        print(f'Time: {self.time}')
+        self.steps += 1
 
         # If finished, return True
         if flag_finished:
-            print('DONE')
+            if self.tracer.enabled:
+                self.trace_step(new_position, flag_crashed, flag_finished)
             return True
 
         # If crashed, trigger the reset function
         elif flag_crashed:
-            print('RESET')
+            self.crashes += 1
             self.reset()
 
         # Otherwise, move the car
         else:
             self.move(new_position, new_track_position)
 
-        print(f'Position: {self.position}')
-        print(f'Track: {self.track_position}')
+        if self.tracer.enabled:
+            self.trace_step(new_position, flag_crashed, flag_finished)
 
     def check_movement(self, new_position):
         """
         Function to check movement of the car before moving the car
 
-        This takes a new position and checks against the old position. The two positions are used to create a
-            BresenhamPath object. This object is used to retrieve the positions traveled. These positions are then
-            passed to the track to retrieve the track status at those positions. Crash status and finished status are
-            then checked and returned to the update_position function for movement.
+        This takes a new position and checks against the old position. The outcome only depends on the old position
+            and the velocity, so it is looked up from the track's movement table, along with the number of cells the
+            check looks at. If the old position is not in the table, check_path walks the positions traveled between the
+            two, stopping as soon as the outcome is settled. Crash status and finished status are then returned to the
+            update_position function for movement, and the cells checked are added to the car's counter.
 
         Args:
             new_position: tuple (int, int). New position the car is attempting to move to
@@ -233,48 +263,39 @@ class Car:
             flag_crashed: Boolean, flag if a crash has occured
             flag_finished: Boolean, flag if the finish line has been reached
         """
-        # Initial flag status
-        flag_crashed = False
-        flag_double_crashed = False
-        flag_finished = False
-        flag_start = False
-
-        # Variable for storing the track types passed over
-        track_types = []
-
-        # Grab the positions between new and last by creating a BresenhamPath object.
-        positions = BresenhamPath(self.last_position, new_position).get_positions()
-
-        # Call to the track to retrieve the track status of those positions
-        print(f'Positions: {positions}')
-        for position in positions:
-            # Retrieve the track type for each position
-            track_type = self.track.get_track_position(position)
-
-            # Flag for start to prevent finishes from the starting line, for the O track
-            if track_type == 'S':
-                flag_start = True
-                flag_finished = False
+        # Look up the outcome for the last position and velocity
+        movement_table = self.track.get_movement_table()
+        if movement_table.get_cell_index(self.last_position) >= 0:
+            velocity = (new_position[0] - self.last_position[0], new_position[1] - self.last_position[1])
+            flag_crashed, flag_finished, cells_checked = movement_table.get_outcome(self.last_position, velocity)
 
-            # Flag for double crash, this prevents the R track from jumping around the y bound
-            elif track_type == '#' and flag_crashed:
-                flag_double_crashed = True
-                flag_finished = False
+        # Walk the positions between last and new
+        else:
+            flag_crashed, flag_finished, cells_checked = check_path(self.track, self.last_position, new_position)
 
-            # Flag for crash
-            elif track_type == '#':
-                flag_crashed = True
+        self.cells_checked += cells_checked
+        return flag_crashed, flag_finished
 
-            # Flag for finish
-            elif track_type == 'F' and not flag_start and not flag_double_crashed:
-                flag_finished = True
+    def trace_step(self, new_position, flag_crashed, flag_finished):
+        """
+        Function to record the current step with the tracer. Only called when the tracer is enabled
 
-            # Save the track type, for debugging
-            track_types.append(track_type)
+        Args:
+            new_position: tuple (int, int), position the car attempted to move to during this step
+            flag_crashed: Boolean, flag if a crash has occured
+            flag_finished: Boolean, flag if the finish line has been reached
+        """
+        message = f'Time: {self.time}, Acceleration: {self.acceleration}, Status: {self.acceleration_status}, ' \
+                  f'Velocity: {self.velocity}, Crashed: {flag_crashed}, Finished: {flag_finished}, ' \
+                  f'Position: {self.position}, Track: {self.track_position}'
 
-        print(f'Track Types: {track_types}')
+        # Add the positions and track types passed over
+        if self.tracer.detailed:
+            positions = get_path(self.last_position, new_position)
+            track_types = [self.track.get_track_position(position) for position in positions]
+            message += f', Positions: {positions}, Track Types: {track_types}'
 
-        return flag_crashed, flag_finished
+        self.tracer.trace(message)
 
     def reset(self):
         """
@@ -289,6 +310,30 @@ class Car:
         # If reset, move back to start_position
         if self.reset_type == 'R':
             self.position = self.start_position
+            self.resets += 1
+
+    def restart(self):
+        """
+        Restart function
+
+        Puts the car back on the start line for a new episode. A new start position is retrieved from the track, and the
+            time, velocity and finished status are cleared
+        """
+        # Position variables for start and current
+        self.start_position = self.track.get_start_position(self.rng)
+        self.position = self.start_position
+        self.track_position = self.track.get_track_position(self.position)
+        self.last_position = self.position
+        self.last_track_position = self.track_position
+
+        # Movement variables & acceleration status
+        self.flag_finished = False
+        self.flag_crashed = False
+        self.stop_status = None
+        self.time = 0
+        self.velocity = (0, 0)
+        self.acceleration = (0, 0)
+        self.acceleration_status = (True, True)
 
     def move(self, new_position, new_track_position):
         """
@@ -321,16 +366,43 @@ class Car:
         """
         return self.velocity
 
+    def stop(self, status):
+        """
+        Stop function
+
+        Ends the episode early, for example when a Watchdog finds the run over budget or stalled. The car counts as
+            finished from here on, with the status given
+
+        Args:
+            status: str, reason the episode ended early, for example 'time_budget' or 'stalled'
+        """
+        self.stop_status = status
+
     def get_finish(self):
         """
-        This function returns the car's finish status
+        This function returns the car's finish status, True once it reached the finish line, ran out of steps or was
+            stopped
 
         Returns:
             flag_finished: Boolean, car's current finished status
         """
-        if self.time >= 200000:
-            return True
-        return self.flag_finished
+        return self.flag_finished or self.time >= self.max_steps or self.stop_status is not None
+
+    def get_status(self):
+        """
+        This function returns how the car's episode ended
+
+        Returns:
+            status: str, 'finished' when the car reached the finish line, 'step_budget' when it ran out of steps, the
+                status it was stopped with, or 'driving' while the episode goes on
+        """
+        if self.flag_finished:
+            return 'finished'
+        if self.stop_status is not None:
+            return self.stop_status
+        if self.time >= self.max_steps:
+            return 'step_budget'
+        return 'driving'
 
     def get_time(self):
         """
@@ -340,3 +412,4 @@ class Car:
            time: int, time the car has been driving
         """
         return self.time
+
@@ -1,5 +1,13 @@
+from bisect import bisect_right
+from heapq import heapify, heappop, heappush
+from itertools import accumulate
 from math import exp
-from random import choices
+from time import perf_counter
+import numpy as np
+from objects.planner import StateSpacePlanner
+from objects.random_stream import RandomStream
+from objects.results import ResultStore
+from objects.value_iteration import get_distance_values, iterate_values, prioritize_values
 
 
 class Driver:
@@ -9,29 +17,71 @@ class Driver:
     This class implements a value iteration algorithm for determining the best track positions. It also calls to the
         QLearning or SARSA algorithms in order to make use of driving around the track.
     """
-    def __init__(self, car, brain_type='Q', discount_rate=.9, convergence_delta=.001, learning_rate=.9):
+    def __init__(self, car, brain_type='Q', discount_rate=.9, convergence_delta=.001, learning_rate=.9,
+                 value_engine='numpy', values=None, value_cache=None, planning_steps=10, rng=None, value_init='zeros'):
         """
-        Init Function. The brain_type is used to implement one of the two reinforcement learning algorithms. The
-            discount_rate is used during value iteration to discount the cost of movement along the track. The
-            convergence_delta is used to check for convergence of the value algorithm.
+        Init Function. The brain_type is used to implement one of the three reinforcement learning algorithms, or the
+            full state space planner. The discount_rate is used during value iteration to discount the cost of movement
+            along the track. The convergence_delta is used to check for convergence of the value algorithm. The
+            value_engine picks the implementation of value iteration, every engine produces the same value matrix within
+            the convergence_delta.
 
         Args:
             car: car, car object already on a track
-            brain_type: char, reinforcement learning algorithm to use. Use 'Q' for QLearning and 'S' for SARSA
+            brain_type: char, reinforcement learning algorithm to use. Use 'Q' for QLearning, 'S' for SARSA and 'D' for
+                DynaQ, QLearning with prioritized sweeping over a model of the observed transitions. Use 'P' to drive
+                with the best action of the full (x, y, vx, vy) state space planner instead, which has nothing to learn
             discount_rate: float, rate at which value iteration is discounted as time goes up
             convergence_delta: float, threshold to stop value iteration
             learning_rate: float, rate to learn using QLearning or SARSA
+            value_engine: str, value iteration implementation. Use 'numpy' for the vectorized sweeps, 'loop' for the
+                cell by cell loop or 'priority' for the prioritized backups spreading out from the finish line.
+                Defaults to 'numpy'
+            values: numpy float array (x, y), optional converged value matrix, for example attached from shared memory.
+                Value iteration is skipped when passed. The matrix is only read until the first update, which copies it
+                into the driver's own table, so a shared or cached matrix is never changed by learning
+            value_cache: ValueCache, optional on disk cache of converged value matrices. A cached matrix skips value
+                iteration, otherwise the result of value iteration is saved to the cache
+            planning_steps: int, number of simulated backups from the model after each real step, for DynaQ
+            rng: RandomStream, optional random number stream for sampling actions, independent of the car's stream.
+                Defaults to a new stream seeded from the operating system
+            value_init: str, starting values of value iteration. Use 'zeros' to start at 0 everywhere or 'distance' to
+                start from the values of the track's finish distances, which are already at or next to the fixed
+                point. Defaults to 'zeros'
         """
         # Brain type determination and variables
-        if brain_type not in ['Q', 'S']:
-            raise ValueError("Brain_Type not found, please specify 'Q' or 'S'")
+        if brain_type not in ['Q', 'S', 'D', 'P']:
+            raise ValueError("Brain_Type not found, please specify 'Q', 'S', 'D' or 'P'")
         else:
             self.brain_type = brain_type
         self.learning_rate = learning_rate
 
+        # DynaQ model of the observed transitions, each a (position, target_x, target_y) in the action selection table,
+        # and the transitions whose targets can move the car to each position. Each transition is queued at most once,
+        # with its priority kept alongside the queue
+        self.planning_steps = planning_steps
+        self.model = set()
+        self.model_predecessors = {}
+        self.planning_queue = []
+        self.planning_priorities = {}
+        self.planning_count = 0
+
         # Value iteration variables
+        if value_engine not in ['numpy', 'loop', 'priority']:
+            raise ValueError("Value_Engine not found, please specify 'numpy', 'loop' or 'priority'")
+        else:
+            self.value_engine = value_engine
         self.discount_rate = discount_rate
         self.convergence_delta = convergence_delta
+        if value_init not in ['zeros', 'distance']:
+            raise ValueError("Value_Init not found, please specify 'zeros' or 'distance'")
+        else:
+            self.value_init = value_init
+
+        # Counters and timer of value iteration, see objects.metrics
+        self.sweeps = 0
+        self.backups = 0
+        self.value_seconds = 0.
 
         # Car Info
         self.car = car
@@ -43,28 +93,132 @@ class Driver:
         self.x = self.track.x
         self.y = self.track.y
 
-        # Initialize a matrix the size of the track for value iteration. Set to 0
-        self.values = [[0 for _ in range(self.y)] for _ in range(self.x)]
+        # Look for the converged values in the cache
+        cache_key = None
+        if values is None and value_cache is not None:
+            cache_key = value_cache.get_key(self.track, discount_rate, convergence_delta, value_engine, value_init)
+            values = value_cache.load(cache_key)
+
+        # Use the converged values if passed. A shared or cached matrix is only copied on the first update
+        self.values_shared = values is not None
+        if values is not None:
+            self.values = values
 
-        # Begin value iteration
-        self.value_iteration()
+        else:
+            # Initialize a matrix the size of the track for value iteration. Set to 0 or from the finish distances
+            self.values = self.get_initial_values().tolist()
+
+            # Begin value iteration
+            start = perf_counter()
+            self.value_iteration()
+            self.value_seconds = perf_counter() - start
+
+            # Save the result for the next run
+            if cache_key is not None:
+                value_cache.save(cache_key, self.values)
+
+        # Action selection table, see create_action_table. The values become a view of the padded values, for a shared
+        # or cached matrix on the first update, see copy_values
+        self.padded_values = None
+        self.action_table = None
+        self.create_action_table()
+
+        # Full state space planner of the Planner brain type, solved once for the track. Its sweeps and time count as
+        # value iteration
+        self.planner = None
+        if self.brain_type == 'P':
+            start = perf_counter()
+            self.planner = StateSpacePlanner(car, discount_rate, convergence_delta)
+            self.planner.value_iteration()
+            self.value_seconds += perf_counter() - start
+            self.sweeps += self.planner.sweeps
+            self.backups += self.planner.sweeps * self.planner.n_states
+
+        # Random number stream for sampling actions, owned by this driver
+        self.rng = rng if rng is not None else RandomStream()
 
     def value_iteration(self):
         """
         Value iteration function
 
+        This function calls to the value iteration engine picked by value_engine. The resulting value matrix is saved
+            as part of the driver's value attribute, and the number of sweeps and Bellman backups made as the sweeps
+            and backups attributes
+        """
+        if self.value_engine == 'numpy':
+            self.value_iteration_numpy()
+        elif self.value_engine == 'priority':
+            self.value_iteration_priority()
+        else:
+            self.value_iteration_loop()
+
+    def get_initial_values(self):
+        """
+        This function returns the starting values of value iteration picked by value_init
+
+        Returns:
+            values: numpy float array (x, y), 0 everywhere, or the values of the track's finish distances
+        """
+        if self.value_init == 'distance':
+            return get_distance_values(self.track.get_finish_distances(), self.discount_rate)
+        return np.zeros((self.x, self.y))
+
+    def value_iteration_numpy(self):
+        """
+        Vectorized value iteration function
+
+        This function masks the walls and finish line of the track as arrays and passes them to iterate_values, which
+            handles every cell of a sweep at once. The sweeps start from the finish distances with the distance
+            value_init. The value matrix is saved back as a list of lists, matching the loop
+        """
+        # Convert the track into wall and finish masks
+        grid = self.track.get_track_grid()
+        walls = grid == self.track.WALL
+        finishes = grid == self.track.FINISH
+
+        # Run the sweeps and save the result
+        values, self.sweeps = iterate_values(walls, finishes, self.discount_rate, self.convergence_delta,
+                                             self.get_initial_values())
+        self.backups = self.sweeps * walls.size
+        self.values = values.tolist()
+
+    def value_iteration_priority(self):
+        """
+        Prioritized value iteration function
+
+        This function masks the walls and finish line of the track as arrays and passes them to prioritize_values, which
+            only backs up the cells around values that changed, largest change first. The value matrix is saved back as
+            a list of lists, matching the loop
+        """
+        # Convert the track into wall and finish masks
+        grid = self.track.get_track_grid()
+
+        # Run the backups and save the result, from the finish distances with the distance value_init
+        values, self.backups = prioritize_values(grid == self.track.WALL, grid == self.track.FINISH,
+                                                 self.discount_rate, self.convergence_delta,
+                                                 self.get_initial_values() if self.value_init == 'distance' else None)
+        self.values = values.tolist()
+
+    def value_iteration_loop(self):
+        """
+        Value iteration function
+
         This function looks at the track and determines the value of moving to each position based on the Bellman's
             equation with respect to the finish line. Walls on the tracks are given a -100 value. The value matrix
             is then saved as part of the driver's value attribute
         """
         # Initial variables to check for convergence.
         flag_convergence = False
+        self.sweeps = 0
+        self.backups = 0
         convergence_value_new = 0
         convergence_value_old = 0
 
         # Loop while not converged
         while not flag_convergence:
             # Traverse each individual cell of the value matrix
+            self.sweeps += 1
+            self.backups += self.x * self.y
             for x in range(self.x):
                 for y in range(self.y):
 
@@ -119,84 +273,159 @@ class Driver:
             else:
                 convergence_value_old = convergence_value_new
 
+    def create_action_table(self):
+        """
+        Function to build the action selection table from the value matrix
+
+        The reward of each action only depends on the target position = position + velocity, as the action moves the car
+            to one of the 9 cells around the target. So for every target the driver keeps a row of the optimal reward
+            and the softmax cumulative weights of the 9 actions. Targets can reach past the track by the max velocity,
+            and the actions one further, so the values are padded with -100 on every side. The value matrix is kept as
+            a view into the padded values, so an update to a value is seen by both. A shared or cached matrix is kept as
+            is, and only padded by copy_values before the first update.
+        """
+        padded_values = self.pad_values()
+        if not self.values_shared:
+            self.padded_values = padded_values
+            self.values = self.get_values_view()
+
+        # Rewards of the 9 actions for every target, in the order used by convert_choice
+        rewards = np.lib.stride_tricks.sliding_window_view(padded_values, (3, 3))
+        rewards = rewards.reshape(rewards.shape[0], rewards.shape[1], 9)
+
+        # Optimal reward and numerically stable softmax of every target
+        max_rewards = rewards.max(axis=2)
+        cumulative_weights = np.cumsum(np.exp(rewards - max_rewards[:, :, None]), axis=2)
+
+        # Save as lists of rows for fast lookups during driving
+        self.action_table = [list(zip(max_row, cumulative_row))
+                             for max_row, cumulative_row in zip(max_rewards.tolist(), cumulative_weights.tolist())]
+
+    def pad_values(self):
+        """
+        This function copies the value matrix into a new matrix padded with -100 on every side. The padding covers the
+            max velocity plus an action
+
+        Returns:
+            padded_values: numpy float array (x + 2 * padding, y + 2 * padding), the padded value matrix
+        """
+        padding = self.track.PADDING + 1
+        padded_values = np.full((self.x + 2 * padding, self.y + 2 * padding), -100.0)
+        padded_values[padding:padding + self.x, padding:padding + self.y] = np.asarray(self.values, dtype=float)
+        return padded_values
+
+    def get_values_view(self):
+        """
+        This function returns the value matrix as a view into the padded values
+
+        Returns:
+            values: numpy float array (x, y), view of the padded values without the padding
+        """
+        padding = self.track.PADDING + 1
+        return self.padded_values[padding:padding + self.x, padding:padding + self.y]
+
+    def copy_values(self):
+        """
+        Function to copy a shared or cached value matrix into the driver's own padded values before the first update.
+            Until then the driver only reads the matrix, so the drivers attached to the same matrix keep a single copy
+            of it in memory, and a Planner driver never copies it
+        """
+        self.padded_values = self.pad_values()
+        self.values = self.get_values_view()
+        self.values_shared = False
+
+    def create_action_row(self, target_x, target_y):
+        """
+        Function to rebuild the row of a single target in the action selection table
+
+        Args:
+            target_x: int, x index of the target in the action selection table
+            target_y: int, y index of the target in the action selection table
+
+        Returns:
+            row: tuple (float, list float), optimal reward and softmax cumulative weights of the 9 actions
+        """
+        rewards = self.padded_values[target_x:target_x + 3, target_y:target_y + 3].ravel().tolist()
+        max_reward = max(rewards)
+        row = (max_reward, list(accumulate([exp(reward - max_reward) for reward in rewards])))
+
+        self.action_table[target_x][target_y] = row
+        return row
+
+    def update_action_table(self, position):
+        """
+        Function to update the action selection table after the value of a single position changed. Only the 9 targets
+            around the position can move the car there, their rows are cleared and rebuilt the next time they are used
+
+        Args:
+            position: tuple (int, int), position of the value that changed
+        """
+        y = position[1] + self.track.PADDING
+        for x in range(position[0] + self.track.PADDING - 1, position[0] + self.track.PADDING + 2):
+            row = self.action_table[x]
+            row[y - 1] = row[y] = row[y + 1] = None
+
     def accelerate_car(self):
         """
         This function interacts with the car by calling to the car accelerate function. The chosen acceleration is
             chosen using an E-Greedy algorithm. The E-Greedy algorithm uses a softmax of the reward for each action
-            against the total reward. After actions, values are updated using a QLearning algorithm.
+            against the total reward, looked up from the action selection table. After actions, values are updated
+            using a QLearning or SARSA algorithm.
         """
-        # Grab position variables
+        # Grab position and velocity variables
         position = self.car.get_position()
-        position_x = position[0]
-        position_y = position[1]
-
-        # Grab velocity variables
         velocity = self.car.get_velocity()
-        velocity_x = velocity[0]
-        velocity_y = velocity[1]
-
-        # Starting variables for rewards
-        rewards = {x: {y: 0 for y in [-1, 0, 1]} for x in [-1, 0, 1]}
-        total_rewards = 0
-        max_reward = -100
-
-        # Loop through each possible acceleration x
-        for acceleration_x in rewards.keys():
-            # Calculate the new position based on the current position, velocity, and acceleration
-            new_position_x = position_x + velocity_x + acceleration_x
-
-            # Loop through each possible acceleration y
-            for acceleration_y in rewards[acceleration_x].keys():
-                # Calculate the new position based on the current position, velocity, and acceleration
-                new_position_y = position_y + velocity_y + acceleration_y
-
-                # Try grabbing the reward for moving to that position
-                try:
-                    reward = self.values[new_position_x][new_position_y]
-                # If there is an index error, we are out of bounds. Set the reward to that as -100
-                except IndexError:
-                    reward = -100
-
-                # Grab the reward for moving to there
-                rewards[acceleration_x][acceleration_y] = reward
-
-                # Only add the reward to total_reward if it's > -100, we don't want to move there
-                if reward > -100:
-                    total_rewards += exp(reward)
-
-                # Keep track of our optimal reward
-                if reward > max_reward:
-                    max_reward = reward
-
-        # Start variable for probabilities
-        probabilities = []
-
-        # Loop through the possible x and y acceleration
-        for acceleration_x in rewards.keys():
-            for acceleration_y in rewards[acceleration_x].keys():
-                # If total_rewards is 0, then we have gone out of bounds
-                if total_rewards == 0:
-                    total_rewards = -100
-
-                # Softmax calculation, if out of bounds or crashed, it will turn to 0%
-                probabilities.append(exp(rewards[acceleration_x][acceleration_y]) / total_rewards)
-
-        # Sample a single choice based on the probabilities calculated above
-        choice = choices(range(9), probabilities)[0]
+
+        # The planner already knows the value of every action from every state, take the best one. A restart can put the
+        # car on a new start position to reset to, which the planner has to be solved for first
+        if self.brain_type == 'P':
+            if self.car.start_position != self.planner.start_position:
+                self.update_planner()
+            self.car.accelerate(self.planner.get_action(position, velocity))
+            return
+
+        # Row of the target in the action selection table, rebuilt if its values changed
+        target_x = position[0] + velocity[0] + self.track.PADDING
+        target_y = position[1] + velocity[1] + self.track.PADDING
+        row = self.action_table[target_x][target_y]
+        if row is None:
+            row = self.create_action_row(target_x, target_y)
+        max_reward, cumulative_weights = row
+
+        # Sample a single choice from the softmax, using the next uniform random number of the stream's block
+        choice = bisect_right(cumulative_weights, self.rng.uniform() * cumulative_weights[8])
 
         # The choice is not a tuple, call to convert_choice in order to convert it
         chosen_action = self.convert_choice(choice)
-        reward = rewards[chosen_action[0]][chosen_action[1]]
 
         # Use the chosen action to accelerate
         self.car.accelerate(chosen_action)
 
+        # Copy a shared or cached value matrix before its first update
+        if self.values_shared:
+            self.copy_values()
+
         # Trigger q_learning based on the optimal action
         if self.brain_type == 'Q':
             self.q_learning(position, max_reward)
+        elif self.brain_type == 'D':
+            self.dyna_q(position, target_x, target_y, max_reward)
         else:
+            reward = self.padded_values[target_x + 1 + chosen_action[0], target_y + 1 + chosen_action[1]]
             self.sarsa(position, reward)
 
+    def update_planner(self):
+        """
+        Function to move the planner to the car's current start position. The planner's extra sweeps and time count as
+            value iteration
+        """
+        start = perf_counter()
+        sweeps = self.planner.sweeps
+        self.planner.set_start_position(self.car.start_position)
+        self.value_seconds += perf_counter() - start
+        self.sweeps += self.planner.sweeps - sweeps
+        self.backups += (self.planner.sweeps - sweeps) * self.planner.n_states
+
     def convert_choice(self, choice):
         """
         This function convert the choice received into a tuple. The choice is an int from range 0-8 inclusive.
@@ -242,8 +471,9 @@ class Driver:
             position: tuple (int, int), represents the car current location to update the value
             max_reward: float, value of the optimal reward at the position above
         """
-        self.values[position[0]][position[1]] += self.learning_rate * \
-                                                 (max_reward - self.values[position[0]][position[1]])
+        self.values[position[0], position[1]] += self.learning_rate * \
+            (max_reward - self.values[position[0], position[1]])
+        self.update_action_table(position)
 
     def sarsa(self, position, prime_reward):
         """
@@ -253,12 +483,112 @@ class Driver:
             position: tuple (int, int), represents the car current location to update the value
             prime_reward: float, value of the movement at the new position
         """
-        self.values[position[0]][position[1]] += self.learning_rate * \
-                                                 (prime_reward - self.values[position[0]][position[1]])
+        self.values[position[0], position[1]] += self.learning_rate * \
+            (prime_reward - self.values[position[0], position[1]])
+        self.update_action_table(position)
+
+    def dyna_q(self, position, target_x, target_y, max_reward):
+        """
+        Function for updating the value matrix using DynaQ with prioritized sweeping
+
+        The real step is recorded in the model and learned with the q_learning function. The transitions in the model
+            that lead to the updated position are then queued by the size of their update, and up to planning_steps of
+            them are replayed with the q_learning function, most important first. Each replayed update queues the
+            transitions leading to its own position in turn.
+
+        Args:
+            position: tuple (int, int), represents the car location before the step
+            target_x: int, x index of the target in the action selection table
+            target_y: int, y index of the target in the action selection table
+            max_reward: float, value of the optimal reward from the target
+        """
+        # Record the transition, it can move the car to the 9 positions around the target
+        transition = (position, target_x, target_y)
+        if transition not in self.model:
+            self.model.add(transition)
+            for x in range(target_x - self.track.PADDING - 1, target_x - self.track.PADDING + 2):
+                for y in range(target_y - self.track.PADDING - 1, target_y - self.track.PADDING + 2):
+                    self.model_predecessors.setdefault((x, y), []).append(transition)
+
+        # Learn from the real step
+        self.q_learning(position, max_reward)
+        self.queue_predecessors(position)
+
+        # Replay the most important transitions from the model
+        replays = 0
+        while self.planning_queue and replays < self.planning_steps:
+            # Skip the old entries of transitions that were requeued with a higher priority
+            priority, _, transition = heappop(self.planning_queue)
+            if self.planning_priorities.get(transition) != -priority:
+                continue
+            del self.planning_priorities[transition]
+            replays += 1
+
+            position, target_x, target_y = transition
+            self.q_learning(position, self.get_max_reward(target_x, target_y))
+            self.queue_predecessors(position)
+
+    def queue_predecessors(self, position):
+        """
+        Function to queue the transitions in the model that can move the car to a position whose value changed. Each is
+            queued by the size of its update, if that is more than the convergence_delta. A transition that is already
+            queued is only requeued if its priority went up. Old entries are skipped when popped, and the queue is
+            rebuilt without them once they make up half of it
 
-    def summarize(self, seed):
+        Args:
+            position: tuple (int, int), position of the value that changed
+        """
+        for transition in self.model_predecessors.get(position, []):
+            # Size of the update this transition would make
+            priority = abs(self.get_max_reward(transition[1], transition[2]) - self.values[transition[0]])
+
+            if priority <= self.convergence_delta or priority <= self.planning_priorities.get(transition, 0):
+                continue
+
+            self.planning_count += 1
+            self.planning_priorities[transition] = priority
+            heappush(self.planning_queue, (-priority, self.planning_count, transition))
+
+        # Rebuild the queue from the current priorities once it is mostly old entries
+        if len(self.planning_queue) > 2 * len(self.planning_priorities):
+            self.planning_queue = [(-priority, index, transition) for index, (transition, priority)
+                                   in enumerate(self.planning_priorities.items())]
+            heapify(self.planning_queue)
+
+    def get_max_reward(self, target_x, target_y):
+        """
+        This function returns the optimal reward from a target, rebuilding its row in the action selection table if its
+            values changed
+
+        Args:
+            target_x: int, x index of the target in the action selection table
+            target_y: int, y index of the target in the action selection table
+
+        Returns:
+            max_reward: float, value of the optimal reward from the target
+        """
+        row = self.action_table[target_x][target_y]
+        if row is None:
+            row = self.create_action_row(target_x, target_y)
+        return row[0]
+
+    def get_summary(self, seed):
+        """
+        This function returns the results of the run as a row for the results store
+
+        Args:
+            seed: int, random seed used for the run
+
+        Returns:
+            row: tuple, seed, track name, reset type, brain type, learning rate, discount rate, time and the status
+                the car's episode ended with, see objects.results.ResultStore
+        """
         if self.brain_type == 'Q':
             brain_type = 'QLearning'
+        elif self.brain_type == 'D':
+            brain_type = 'DynaQ'
+        elif self.brain_type == 'P':
+            brain_type = 'Planner'
         else:
             brain_type = 'SARSA'
 
@@ -267,9 +597,17 @@ class Driver:
         else:
             reset_type = 'Start_Reset'
 
-        csv_row = ','.join([str(seed), self.track.track_name, reset_type, brain_type, str(self.learning_rate),
-                            str(self.car.time)])
-        csv_row += '\n'
+        return (seed, self.track.track_name, reset_type, brain_type, self.learning_rate, self.discount_rate,
+                self.car.time, self.car.get_status())
+
+    def summarize(self, seed, file_location='output//results.db'):
+        """
+        This function adds the results of the run to the results store
 
-        with open(f'output\\data.csv', 'a') as file:
-            file.write(csv_row)
+        Args:
+            seed: int, random seed used for the run
+            file_location: str, file of the results store. Defaults to output//results.db
+        """
+        result_store = ResultStore(file_location)
+        result_store.save([self.get_summary(seed)])
+        result_store.close()
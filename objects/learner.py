@@ -0,0 +1,135 @@
+from objects.random_stream import RandomStream
+import time
+import numpy as np
+
+
+class QLearner:
+    """
+    Class QLearner which learns the value of every action from every (position, velocity) state
+
+    This class keeps a dense float32 action value tensor indexed by (x, y, vx + 5, vy + 5, action), with actions in the
+        order used by Driver.convert_choice. Actions are chosen E-Greedy and the tensor is updated with QLearning or
+        SARSA after every step. Many episodes are driven in one process by restarting the car on the start line.
+    """
+    def __init__(self, car, brain_type='Q', learning_rate=.1, discount_rate=.9, epsilon=.1, rng=None):
+        """
+        Init function, takes a car already on a track and creates an action value tensor the size of the track
+
+        Args:
+            car: car, car object already on a track
+            brain_type: char, reinforcement learning algorithm to use. Use 'Q' for QLearning and 'S' for SARSA
+            learning_rate: float, rate to learn using QLearning or SARSA
+            discount_rate: float, rate at which future rewards are discounted
+            epsilon: float, chance of picking a random action instead of the best one
+            rng: RandomStream, optional random number stream for the E-Greedy choices, independent of the car's stream.
+                Defaults to a new stream seeded from the operating system
+        """
+        # Brain type determination and variables
+        if brain_type not in ['Q', 'S']:
+            raise ValueError("Brain_Type not found, please specify 'Q' or 'S'")
+        else:
+            self.brain_type = brain_type
+        self.learning_rate = learning_rate
+        self.discount_rate = discount_rate
+        self.epsilon = epsilon
+
+        # Car and Track Info
+        self.car = car
+        self.track = car.track
+
+        # Action values for every state, starting at 0
+        self.q_values = np.zeros((self.track.x, self.track.y, 11, 11, 9), dtype=np.float32)
+
+        # Random number stream for the E-Greedy choices, owned by this learner
+        self.rng = rng if rng is not None else RandomStream()
+
+        # Counters for reporting
+        self.episodes = 0
+        self.updates = 0
+
+    def get_state(self):
+        """
+        This function returns the index of the car's current state in the action value tensor
+
+        Returns:
+            state: tuple (int, int, int, int), position and velocity shifted to start at 0
+        """
+        position = self.car.get_position()
+        velocity = self.car.get_velocity()
+        return position[0], position[1], velocity[0] + 5, velocity[1] + 5
+
+    def choose_action(self, state):
+        """
+        This function picks an action E-Greedy, a random action with a chance of epsilon, otherwise the best action
+
+        Args:
+            state: tuple (int, int, int, int), index of the state in the action value tensor
+
+        Returns:
+            action: int, action from 0-8 inclusive, see Driver.convert_choice
+        """
+        if self.rng.uniform() < self.epsilon:
+            return int(self.rng.uniform() * 9)
+        return int(self.q_values[state].argmax())
+
+    def episode(self):
+        """
+        Function to drive a single episode from the start line until the car finishes, updating the action values after
+            every step
+
+        Returns:
+            time: int, time the car took to finish
+        """
+        self.car.restart()
+        state = self.get_state()
+        action = self.choose_action(state)
+
+        while not self.car.get_finish():
+            # Use the chosen action to accelerate
+            self.car.accelerate((action // 3 - 1, action % 3 - 1))
+            new_state = self.get_state()
+            new_action = self.choose_action(new_state)
+
+            # Every step costs 1, there is nothing left to gain after finishing
+            if self.car.flag_finished:
+                target = -1
+            # QLearning uses the optimal action, SARSA uses the next action that will be taken
+            elif self.brain_type == 'Q':
+                target = -1 + self.discount_rate * self.q_values[new_state].max()
+            else:
+                target = -1 + self.discount_rate * self.q_values[new_state + (new_action,)]
+
+            # Update the action value
+            index = state + (action,)
+            self.q_values[index] += self.learning_rate * (target - self.q_values[index])
+            self.updates += 1
+
+            state = new_state
+            action = new_action
+
+        self.episodes += 1
+        return self.car.get_time()
+
+    def train(self, episodes):
+        """
+        Function to drive many episodes and report on the training
+
+        Args:
+            episodes: int, number of episodes to drive
+
+        Returns:
+            report: dict, the time of each episode, the number of updates, the updates per second and the memory used
+                by the action value tensor in bytes
+        """
+        updates = self.updates
+        start = time.perf_counter()
+
+        times = [self.episode() for _ in range(episodes)]
+
+        seconds = time.perf_counter() - start
+        return {
+            'times': times,
+            'updates': self.updates - updates,
+            'updates_per_second': (self.updates - updates) / seconds if seconds > 0 else 0.,
+            'memory_bytes': self.q_values.nbytes
+        }
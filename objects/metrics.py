@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+from time import perf_counter
+
+
+class Metrics:
+    """
+    Class Metrics which reports the runtime counters of a car and its driver
+
+    The car and driver keep their own counters as plain int attributes, so counting costs a single addition where
+        something happens. This class only reads them when asked, times the driving phase, and writes a snapshot as
+        json or in the Prometheus text format. Snapshots are written under a temporary name and then renamed into place,
+        so a scraper never reads a partial file.
+    """
+    # Prefix of every metric name in the Prometheus text format
+    PREFIX = 'racetrack'
+
+    def __init__(self, car, driver, file_location=None, file_format='json'):
+        """
+        Init function, takes the car and driver to report on and where snapshots should go
+
+        Args:
+            car: car, car object being driven
+            driver: driver, driver of the car
+            file_location: str, optional file to write snapshots to
+            file_format: str, format of the snapshots. Use 'json' or 'prometheus'. Defaults to 'json'
+        """
+        if file_format not in ['json', 'prometheus']:
+            raise ValueError("Metrics format not found, please specify 'json' or 'prometheus'")
+
+        self.car = car
+        self.driver = driver
+        self.file_location = file_location
+        self.file_format = file_format
+
+        # Driving phase timer
+        self.driving_seconds = 0.
+        self.driving_start = None
+
+    def start_driving(self):
+        """
+        This function starts the driving phase timer
+        """
+        self.driving_start = perf_counter()
+
+    def stop_driving(self):
+        """
+        This function stops the driving phase timer and adds the time since it was started
+        """
+        if self.driving_start is not None:
+            self.driving_seconds += perf_counter() - self.driving_start
+            self.driving_start = None
+
+    def get_driving_seconds(self):
+        """
+        This function returns the time spent driving, including the current phase if the timer is running
+
+        Returns:
+            driving_seconds: float, time spent driving in seconds
+        """
+        if self.driving_start is None:
+            return self.driving_seconds
+        return self.driving_seconds + perf_counter() - self.driving_start
+
+    def get_metrics(self):
+        """
+        This function returns a snapshot of every counter and timer
+
+        Returns:
+            metrics: dict, value of each metric keyed by name
+        """
+        driving_seconds = self.get_driving_seconds()
+
+        return {
+            'steps': self.car.steps,
+            'crashes': self.car.crashes,
+            'resets': self.car.resets,
+            'acceleration_failures': self.car.acceleration_failures,
+            'cells_checked': self.car.cells_checked,
+            'value_iteration_sweeps': self.driver.sweeps,
+            'value_iteration_backups': self.driver.backups,
+            'value_iteration_seconds': self.driver.value_seconds,
+            'driving_seconds': driving_seconds,
+            'steps_per_second': self.car.steps / driving_seconds if driving_seconds > 0 else 0.
+        }
+
+    def get_labels(self):
+        """
+        This function returns the labels of the run, used to tell runs apart in the Prometheus text format
+
+        Returns:
+            labels: dict, track, reset type and brain type of the run
+        """
+        return {
+            'track': self.car.track.track_name,
+            'reset_type': self.car.reset_type,
+            'brain_type': self.driver.brain_type
+        }
+
+    def to_json(self):
+        """
+        This function returns a snapshot as json, with the labels of the run
+
+        Returns:
+            text: str, json object of the labels and metrics
+        """
+        return json.dumps({**self.get_labels(), **self.get_metrics()}, indent=4)
+
+    def to_prometheus(self):
+        """
+        This function returns a snapshot in the Prometheus text format. Counts are counters and the rest are gauges
+
+        Returns:
+            text: str, a type line and a sample line for each metric
+        """
+        labels = ','.join(f'{name}="{value}"' for name, value in self.get_labels().items())
+
+        lines = []
+        for name, value in self.get_metrics().items():
+            if isinstance(value, int):
+                name = f'{self.PREFIX}_{name}_total'
+                lines.append(f'# TYPE {name} counter')
+            else:
+                name = f'{self.PREFIX}_{name}'
+                lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{{{labels}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """
+        This function writes a snapshot to the file location, if there is one
+        """
+        if self.file_location is None:
+            return
+
+        text = self.to_json() if self.file_format == 'json' else self.to_prometheus()
+
+        directory = os.path.dirname(os.path.abspath(self.file_location))
+        file_descriptor, temporary_location = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                file.write(text)
+            os.replace(temporary_location, self.file_location)
+        except BaseException:
+            os.remove(temporary_location)
+            raise
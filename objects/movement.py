@@ -0,0 +1,187 @@
+import numpy as np
+from objects.bresenham import OFFSET_PATHS, walk_path
+
+
+class MovementTable:
+    """
+    Class MovementTable, a companion index to the track that holds the outcome of every possible movement
+
+    The crash and finish status of a movement only depends on the start cell and the velocity, and velocity is capped
+        at 5 in each direction. This class walks the path for every drivable cell and all 121 velocities once, and
+        saves the crash flag, finish flag, the index of the first wall along the path and the number of cells
+        check_path looks at before the outcome is settled in compact arrays. The flags and count are also packed into a
+        single array, so a step reads its whole outcome with one lookup.
+    """
+    def __init__(self, track):
+        """
+        Init function, takes a track and precomputes the outcomes for all of its drivable cells
+
+        Args:
+            track: track, track object with a track read in from data
+        """
+        # Track
+        self.track = track
+
+        # Every drivable (x, y) cell gets an index, walls get -1
+        self.cells = np.argwhere(track.get_track_grid() != track.WALL)
+        self.cell_index = np.full((track.x, track.y), -1, dtype=np.int32)
+        self.cell_index[self.cells[:, 0], self.cells[:, 1]] = np.arange(len(self.cells))
+
+        # Outcome arrays, one row per drivable cell and one column per velocity
+        self.crashed = np.zeros((len(self.cells), 121), dtype=bool)
+        self.finished = np.zeros((len(self.cells), 121), dtype=bool)
+        self.first_wall = np.full((len(self.cells), 121), -1, dtype=np.int8)
+        self.cells_checked = np.zeros((len(self.cells), 121), dtype=np.int8)
+        self.create_table()
+
+        # Packed outcome of each movement, bit 0 crashed, bit 1 finished and the cells checked above them
+        self.outcomes = (self.crashed.astype(np.int16) | (self.finished.astype(np.int16) << 1) |
+                         (self.cells_checked.astype(np.int16) << 2))
+
+    def create_table(self):
+        """
+        This function walks the path of every velocity for all drivable cells at once and fills in the outcome arrays.
+            The rules are the same as check_path, applied to arrays
+        """
+        track = self.track
+
+        for (velocity_x, velocity_y), offsets in OFFSET_PATHS.items():
+            # Shift the cached Bresenham offsets by every cell to grab the track codes passed through
+            track_codes = track.get_track_positions(self.cells[:, None, :] + np.array(offsets)[None, :, :])
+
+            # Initial flag status
+            flag_crashed = np.zeros(len(self.cells), dtype=bool)
+            flag_double_crashed = np.zeros(len(self.cells), dtype=bool)
+            flag_finished = np.zeros(len(self.cells), dtype=bool)
+            flag_start = np.zeros(len(self.cells), dtype=bool)
+            first_wall = np.full(len(self.cells), -1, dtype=np.int8)
+            flag_settled = np.zeros(len(self.cells), dtype=bool)
+            cells_checked = np.zeros(len(self.cells), dtype=np.int8)
+
+            for index in range(len(offsets)):
+                track_code = track_codes[:, index]
+                wall = track_code == track.WALL
+                start = track_code == track.START
+
+                # Count the cell for paths check_path is still walking, and settle the paths it would stop on
+                cells_checked += ~flag_settled
+                flag_settled |= (wall & (flag_crashed | flag_start)) | (start & flag_crashed)
+
+                # Flag for start to prevent finishes from the starting line, for the O track
+                flag_start |= start
+                flag_finished &= ~start
+
+                # Flag for double crash, this prevents the R track from jumping around the y bound
+                flag_double_crashed |= wall & flag_crashed
+                flag_finished &= ~(wall & flag_crashed)
+
+                # Flag for crash, saving where the first wall is
+                first_wall[wall & ~flag_crashed] = index
+                flag_crashed |= wall
+
+                # Flag for finish
+                flag_finished |= (track_code == track.FINISH) & ~flag_start & ~flag_double_crashed
+
+            # Save the outcome
+            velocity_index = get_velocity_index((velocity_x, velocity_y))
+            self.crashed[:, velocity_index] = flag_crashed
+            self.finished[:, velocity_index] = flag_finished
+            self.first_wall[:, velocity_index] = first_wall
+            self.cells_checked[:, velocity_index] = cells_checked
+
+    def get_cell_index(self, position):
+        """
+        This function returns the index of a drivable position
+
+        Args:
+            position: tuple (int, int), position on the track
+
+        Returns:
+            index: int, index into the outcome arrays, -1 if the position is not a drivable cell
+        """
+        if 0 <= position[0] < self.track.x and 0 <= position[1] < self.track.y:
+            return self.cell_index[position[0], position[1]]
+        return -1
+
+    def get_outcome(self, position, velocity):
+        """
+        This function returns the outcome of moving from a position with a velocity
+
+        Args:
+            position: tuple (int, int), drivable position on the track
+            velocity: tuple (int, int), velocity bounded to [-5, 5]
+
+        Returns:
+            flag_crashed: Boolean, flag if a crash has occured
+            flag_finished: Boolean, flag if the finish line has been reached
+            cells_checked: int, number of cells check_path looks at for this movement
+        """
+        outcome = int(self.outcomes[self.cell_index[position[0], position[1]], get_velocity_index(velocity)])
+        return bool(outcome & 1), bool(outcome & 2), outcome >> 2
+
+
+def get_velocity_index(velocity):
+    """
+    This function converts a velocity into its column in the outcome arrays
+
+    Args:
+        velocity: tuple (int, int), velocity bounded to [-5, 5]
+
+    Returns:
+        velocity_index: int, column for the velocity, from 0 to 120
+    """
+    return (velocity[0] + 5) * 11 + (velocity[1] + 5)
+
+
+def check_path(track, last_position, new_position):
+    """
+    Function to check the track types passed over by a movement, walking the path and stopping as soon as the outcome
+        is settled
+
+    The cells are walked in the order of walk_path. Crossing a wall flags a crash, and reaching the finish line flags a
+        finish unless the path has already passed over the start line (for the O track) or crashed twice (which prevents
+        the R track from jumping around the y bound). Once the path has crashed and either crashed again or passed the
+        start line, no later cell can change the outcome, so the rest of the path is skipped.
+
+    Args:
+        track: track, track object with a track read in from data
+        last_position: tuple (int, int), starting position before movement
+        new_position: tuple (int, int), end position after applying velocity changes
+
+    Returns:
+        flag_crashed: Boolean, flag if a crash has occured
+        flag_finished: Boolean, flag if the finish line has been reached
+        cells_checked: int, number of cells looked at
+    """
+    grid = track.grid
+    padding = track.PADDING
+
+    # Initial flag status
+    flag_crashed = False
+    flag_finished = False
+    flag_start = False
+    cells_checked = 0
+
+    for position in walk_path(last_position, new_position):
+        cells_checked += 1
+        track_code = grid[position[0] + padding, position[1] + padding]
+
+        # Flag for start to prevent finishes from the starting line, for the O track. Settled if already crashed
+        if track_code == track.START:
+            if flag_crashed:
+                return True, False, cells_checked
+            flag_start = True
+            flag_finished = False
+
+        # Flag for crash. A double crash, which prevents the R track from jumping around the y bound, or a crash after
+        # the start line can no longer finish, so the outcome is settled
+        elif track_code == track.WALL:
+            if flag_crashed or flag_start:
+                return True, False, cells_checked
+            flag_crashed = True
+
+        # Flag for finish
+        elif track_code == track.FINISH and not flag_start:
+            flag_finished = True
+
+    return flag_crashed, flag_finished, cells_checked
@@ -0,0 +1,238 @@
+import numpy as np
+
+
+class StateSpacePlanner:
+    """
+    Class StateSpacePlanner which solves the track over the full (x, y, vx, vy) state space
+
+    This class compiles the car's movement rules into a sparse transition table once. For each state and each of the 9
+        actions the table lists the up to 4 outcomes of the 20% acceleration failure roll, with the velocity cap,
+        crashes and finishes handled the same way as the car. Value iteration then runs as sparse matrix-vector
+        products over the table.
+    """
+    def __init__(self, car, discount_rate=.9, convergence_delta=.001):
+        """
+        Init function, takes a car already on a track and compiles the transition table for that track
+
+        Args:
+            car: car, car object already on a track. The track, reset_type and start_position are used
+            discount_rate: float, rate at which value iteration is discounted as time goes up
+            convergence_delta: float, threshold to stop value iteration
+        """
+        # Value iteration variables
+        self.discount_rate = discount_rate
+        self.convergence_delta = convergence_delta
+
+        # Car Info
+        self.reset_type = car.reset_type
+        self.start_position = car.start_position
+
+        # Track Info
+        self.track = car.track
+        self.x = self.track.x
+        self.y = self.track.y
+
+        # Every drivable (x, y) cell has an index in the track's movement table, walls have -1
+        self.movement_table = self.track.get_movement_table()
+        self.cells = self.movement_table.cells
+        self.cell_index = self.movement_table.cell_index
+
+        # A state is a cell and one of the 11 x 11 velocities. The extra last state is terminal, for the finish line
+        self.n_states = len(self.cells) * 121
+        self.terminal = self.n_states
+
+        # Sparse transition table, one entry per (state, action, outcome). With the R reset_type, the entries that
+        # crash back to the start position are kept, see set_start_position
+        self.rows = None
+        self.next_states = None
+        self.probabilities = None
+        self.resets = None
+        self.compile_transitions()
+
+        # Values for every state, plus the terminal state held at 0
+        self.values = np.zeros(self.n_states + 1)
+        self.sweeps = 0
+
+    def state_index(self, position, velocity):
+        """
+        This function returns the index of a (position, velocity) state
+
+        Args:
+            position: tuple (int, int), drivable position on the track
+            velocity: tuple (int, int), velocity bounded to [-5, 5]
+
+        Returns:
+            index: int, index of the state
+        """
+        return self.cell_index[position] * 121 + (velocity[0] + 5) * 11 + (velocity[1] + 5)
+
+    def compile_movements(self):
+        """
+        Function to resolve every movement the car can make
+
+        Movement only depends on the start cell and the velocity after acceleration, so the next state for each
+            (cell, velocity) pair is read from the track's movement table.
+
+        Returns:
+            movements: numpy int array (cells, 121), the next state for each cell and velocity
+        """
+        cells = np.arange(len(self.cells))[:, None]
+        velocity_index = np.arange(121)[None, :]
+
+        # Crashing stops the car, either in place or back at the start
+        if self.reset_type == 'S':
+            reset_index = cells
+        else:
+            reset_index = self.cell_index[self.start_position]
+
+        # Otherwise the car moves with its new velocity. Positions are only looked up for moves that did not crash
+        cell_positions = self.cells.reshape(-1, 1, 2)
+        new_x = cell_positions[:, :, 0] + velocity_index // 11 - 5
+        new_y = cell_positions[:, :, 1] + velocity_index % 11 - 5
+        moved = ~self.movement_table.crashed & ~self.movement_table.finished
+        moved_index = np.zeros(moved.shape, dtype=np.int64)
+        moved_index[moved] = self.cell_index[new_x[moved], new_y[moved]]
+
+        movements = np.where(moved, moved_index * 121 + velocity_index, reset_index * 121 + 60)
+
+        # Finishing ends the run
+        movements[self.movement_table.finished] = self.terminal
+
+        return movements
+
+    def compile_transitions(self):
+        """
+        Function to build the sparse transition table
+
+        For each action, an acceleration on either axis can fail with a 20% chance if the car is stopped or already
+            moving in that direction. This gives up to 4 outcomes per action. Velocity is capped at 5 in each direction.
+        """
+        movements = self.compile_movements()
+
+        # Velocity of every state
+        velocities = np.arange(121)
+        velocity_x = np.tile(velocities // 11 - 5, len(self.cells))
+        velocity_y = np.tile(velocities % 11 - 5, len(self.cells))
+        cells = np.repeat(np.arange(len(self.cells)), 121)
+        states = np.arange(self.n_states)
+
+        # Crashes that are not also finishes send the car back to reset_index, see compile_movements
+        crashes = self.movement_table.crashed & ~self.movement_table.finished
+
+        rows = []
+        next_states = []
+        probabilities = []
+        resets = []
+
+        # Loop through all possible x and y actions, in the order used by Driver.convert_choice
+        for action, (acceleration_x, acceleration_y) in enumerate([(x, y) for x in [-1, 0, 1] for y in [-1, 0, 1]]):
+            # Failure can only occur when the acceleration is not a break
+            can_fail_x = (acceleration_x * velocity_x >= 0) & (acceleration_x != 0)
+            can_fail_y = (acceleration_y * velocity_y >= 0) & (acceleration_y != 0)
+
+            # Loop through the success or failure of each axis
+            for success_x in [True, False]:
+                for success_y in [True, False]:
+                    probability = np.where(can_fail_x, .8 if success_x else .2, 1. if success_x else 0.) * \
+                        np.where(can_fail_y, .8 if success_y else .2, 1. if success_y else 0.)
+                    possible = probability > 0
+
+                    # Apply the acceleration and cap the velocity
+                    new_velocity_x = np.clip(velocity_x + (acceleration_x if success_x else 0), -5, 5)
+                    new_velocity_y = np.clip(velocity_y + (acceleration_y if success_y else 0), -5, 5)
+                    velocity_index = (new_velocity_x + 5) * 11 + (new_velocity_y + 5)
+
+                    rows.append(states[possible] * 9 + action)
+                    next_states.append(movements[cells[possible], velocity_index[possible]])
+                    probabilities.append(probability[possible])
+                    resets.append(crashes[cells[possible], velocity_index[possible]])
+
+        # Save the table sorted by row
+        rows = np.concatenate(rows)
+        order = np.argsort(rows, kind='stable')
+        self.rows = rows[order]
+        self.next_states = np.concatenate(next_states)[order]
+        self.probabilities = np.concatenate(probabilities)[order]
+        if self.reset_type == 'R':
+            self.resets = np.concatenate(resets)[order]
+
+    def set_start_position(self, start_position):
+        """
+        Function to move the start position the car resets to after crashing, for example after the car restarted on a
+            new one. With the R reset_type the crashes in the transition table are pointed at the new start position and
+            value iteration continues from the current values, which only need to spread the change
+
+        Args:
+            start_position: tuple (int, int), new start position of the car
+        """
+        if start_position == self.start_position:
+            return
+        self.start_position = start_position
+
+        if self.reset_type == 'R':
+            self.next_states[self.resets] = self.state_index(start_position, (0, 0))
+            self.value_iteration()
+
+    def get_q_values(self):
+        """
+        Function to calculate the value of every action from every state
+
+        Returns:
+            q_values: numpy float array (states, 9), value of each action
+        """
+        expected = np.bincount(self.rows, weights=self.probabilities * self.values[self.next_states],
+                               minlength=self.n_states * 9)
+        return -1 + (self.discount_rate * expected.reshape(self.n_states, 9))
+
+    def value_iteration(self):
+        """
+        Value iteration function
+
+        Each sweep is a single sparse matrix-vector product over the transition table. Sweeps stop once no state
+            changes by more than the convergence_delta
+
+        Returns:
+            values: numpy float array (states + 1), converged value of each state, the last is the terminal state
+        """
+        while True:
+            self.sweeps += 1
+            new_values = self.get_q_values().max(axis=1)
+            delta = np.abs(new_values - self.values[:-1]).max()
+            self.values[:-1] = new_values
+
+            if delta < self.convergence_delta:
+                break
+
+        return self.values
+
+    def get_action_values(self, position, velocity):
+        """
+        This function returns the value of each action from a single state
+
+        Args:
+            position: tuple (int, int), drivable position on the track
+            velocity: tuple (int, int), velocity bounded to [-5, 5]
+
+        Returns:
+            action_values: numpy float array (9), value of each action in the order used by Driver.convert_choice
+        """
+        row = self.state_index(position, velocity) * 9
+        start, end = np.searchsorted(self.rows, [row, row + 9])
+        expected = np.bincount(self.rows[start:end] - row,
+                               weights=self.probabilities[start:end] * self.values[self.next_states[start:end]],
+                               minlength=9)
+        return -1 + (self.discount_rate * expected)
+
+    def get_action(self, position, velocity):
+        """
+        This function returns the best acceleration from a single state
+
+        Args:
+            position: tuple (int, int), drivable position on the track
+            velocity: tuple (int, int), velocity bounded to [-5, 5]
+
+        Returns:
+            acceleration: tuple (int, int), the acceleration with the highest value
+        """
+        choice = int(np.argmax(self.get_action_values(position, velocity)))
+        return choice // 3 - 1, choice % 3 - 1
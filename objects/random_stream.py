@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class RandomStream:
+    """
+    Class RandomStream, an independent stream of random numbers for a single car or driver
+
+    Wraps a numpy Generator. The numbers used at every step, the acceleration failure rolls and the uniforms for
+        sampling actions, are drawn a block at a time and handed out one by one, as a single draw from the Generator
+        costs about as much as a block of a thousand. A stream only depends on its seed and the order of the calls
+        made on it, so runs are reproducible no matter how they are spread across processes.
+    """
+    # Chance of an acceleration failing
+    FAILURE_RATE = .2
+
+    def __init__(self, seed=None, block_size=1024):
+        """
+        Init function, takes the seed of the stream
+
+        Args:
+            seed: int or numpy SeedSequence, seed of the stream. Defaults to fresh entropy from the operating system
+            block_size: int, number of values drawn at a time
+        """
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+
+        # Blocks of failure rolls and uniforms, refilled when used up
+        self.failures = []
+        self.failure_index = 0
+        self.uniforms = []
+        self.uniform_index = 0
+
+    def roll_failure(self):
+        """
+        This function rolls for an acceleration failure
+
+        Returns:
+            failed: bool, True with a chance of FAILURE_RATE
+        """
+        if self.failure_index == len(self.failures):
+            self.failures = (self.generator.random(self.block_size) < self.FAILURE_RATE).tolist()
+            self.failure_index = 0
+
+        failed = self.failures[self.failure_index]
+        self.failure_index += 1
+        return failed
+
+    def uniform(self):
+        """
+        This function returns a uniform random number
+
+        Returns:
+            uniform: float, random number in [0, 1)
+        """
+        if self.uniform_index == len(self.uniforms):
+            self.uniforms = self.generator.random(self.block_size).tolist()
+            self.uniform_index = 0
+
+        uniform = self.uniforms[self.uniform_index]
+        self.uniform_index += 1
+        return uniform
+
+    def choice(self, sequence):
+        """
+        This function picks a random item of a sequence, drawn directly from the Generator
+
+        Args:
+            sequence: list, items to pick from
+
+        Returns:
+            item: the picked item
+        """
+        return sequence[int(self.generator.integers(len(sequence)))]
+
+
+def spawn_streams(seed=None, n_streams=2):
+    """
+    Function to create independent streams from a single seed, for example one for a car and one for its driver
+
+    Args:
+        seed: int, seed of the run. Defaults to fresh entropy from the operating system
+        n_streams: int, number of streams. Defaults to 2
+
+    Returns:
+        streams: list RandomStream, independent streams spawned from the seed
+    """
+    return [RandomStream(child) for child in np.random.SeedSequence(seed).spawn(n_streams)]
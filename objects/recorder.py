@@ -0,0 +1,156 @@
+import os
+import numpy as np
+
+
+class Recorder:
+    """
+    Class Recorder which keeps the trajectory of a car, one entry per step
+
+    Each field of a step has its own preallocated NumPy buffer, struct of arrays, which doubles in size when it fills
+        up. The car calls record after every step, which writes into the buffers through flat memoryviews, as setting
+        single items that way is several times faster than NumPy indexing. Saving writes each field to its own memory
+        mapped .npy file in a directory, so a replay can read a single field without loading the rest. Positions and
+        time can be delta encoded, which keeps the saved values small so the files compress well.
+    """
+    # Name, dtype and shape of each field of a step
+    FIELDS = [
+        ('time', np.int32, ()),
+        ('position', np.int16, (2,)),
+        ('velocity', np.int8, (2,)),
+        ('requested_acceleration', np.int8, (2,)),
+        ('acceleration', np.int8, (2,)),
+        ('crashed', np.bool_, ()),
+        ('finished', np.bool_, ())
+    ]
+
+    # Fields that can be delta encoded
+    DELTA_FIELDS = ['time', 'position']
+
+    def __init__(self, capacity=1 << 16):
+        """
+        Init function, takes the number of steps to preallocate
+
+        Args:
+            capacity: int, number of steps the buffers hold before they grow. Defaults to 65536
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.buffers = {name: np.zeros((capacity,) + shape, dtype=dtype) for name, dtype, shape in self.FIELDS}
+
+        # Flat views of the buffers for record, pairs are saved as 2 items in a row
+        self.time = None
+        self.position = None
+        self.velocity = None
+        self.requested_acceleration = None
+        self.acceleration = None
+        self.crashed = None
+        self.finished = None
+        self.create_views()
+
+    def create_views(self):
+        """
+        This function creates a flat memoryview of every buffer, saved as an attribute named after its field
+        """
+        for name, buffer in self.buffers.items():
+            setattr(self, name, memoryview(buffer.reshape(-1)))
+
+    def record(self, car, requested_acceleration):
+        """
+        This function records the step the car just took
+
+        Args:
+            car: car, car object after the step
+            requested_acceleration: tuple (int, int), acceleration passed to the car before bounds and failures
+        """
+        index = self.count
+        if index == self.capacity:
+            self.grow()
+        pair = 2 * index
+
+        self.time[index] = car.time
+        position = car.position
+        self.position[pair] = position[0]
+        self.position[pair + 1] = position[1]
+        velocity = car.velocity
+        self.velocity[pair] = velocity[0]
+        self.velocity[pair + 1] = velocity[1]
+        self.requested_acceleration[pair] = requested_acceleration[0]
+        self.requested_acceleration[pair + 1] = requested_acceleration[1]
+        acceleration = car.acceleration
+        self.acceleration[pair] = acceleration[0]
+        self.acceleration[pair + 1] = acceleration[1]
+        self.crashed[index] = car.flag_crashed
+        self.finished[index] = car.flag_finished
+        self.count = index + 1
+
+    def grow(self):
+        """
+        This function doubles the size of every buffer, keeping the steps recorded so far
+        """
+        self.capacity *= 2
+        for name, dtype, shape in self.FIELDS:
+            buffer = np.zeros((self.capacity,) + shape, dtype=dtype)
+            buffer[:self.count] = self.buffers[name][:self.count]
+            self.buffers[name] = buffer
+        self.create_views()
+
+    def get_steps(self):
+        """
+        This function returns the recorded steps
+
+        Returns:
+            steps: dict, numpy array of each field keyed by name, one entry per step. The arrays are views of the
+                buffers
+        """
+        return {name: buffer[:self.count] for name, buffer in self.buffers.items()}
+
+    def save(self, directory, delta=False):
+        """
+        This function saves the recorded steps as a .npy file per field in a directory. Delta encoded fields are saved
+            under the name <field>_delta, as the difference from the step before, with the first step as is
+
+        Args:
+            directory: str, directory to save to. It is created if needed
+            delta: bool, delta encode the time and positions. Defaults to False
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        for name, values in self.get_steps().items():
+            # Remove the file of the other encoding left by an earlier save
+            for file_name in [f'{name}.npy', f'{name}_delta.npy']:
+                if os.path.exists(os.path.join(directory, file_name)):
+                    os.remove(os.path.join(directory, file_name))
+
+            if delta and name in self.DELTA_FIELDS:
+                name = f'{name}_delta'
+                values = np.diff(values, axis=0, prepend=np.zeros((1,) + values.shape[1:], dtype=values.dtype))
+
+            file = np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=values.dtype,
+                                             shape=values.shape)
+            file[:] = values
+            file.flush()
+            del file
+
+
+def load_steps(directory):
+    """
+    Function to load the steps saved by Recorder.save, decoding delta encoded fields. Fields that are not delta encoded
+        are loaded memory mapped and read only
+
+    Args:
+        directory: str, directory the steps were saved to
+
+    Returns:
+        steps: dict, numpy array of each field keyed by name, one entry per step
+    """
+    steps = {}
+    for name, _, _ in Recorder.FIELDS:
+        file_location = os.path.join(directory, f'{name}.npy')
+
+        if os.path.exists(file_location):
+            steps[name] = np.load(file_location, mmap_mode='r')
+        else:
+            deltas = np.load(os.path.join(directory, f'{name}_delta.npy'), mmap_mode='r')
+            steps[name] = np.cumsum(deltas, axis=0, dtype=deltas.dtype)
+
+    return steps
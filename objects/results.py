@@ -0,0 +1,292 @@
+import csv
+import json
+import os
+import sqlite3
+import numpy as np
+from objects.aggregator import Aggregator, RunningStats
+
+
+class ResultStore:
+    """
+    Class ResultStore which keeps the result of every run in a SQLite database
+
+    The database runs in write-ahead log mode, so many processes can add results at once while others read, and a
+        writer waits for the lock instead of failing. Rows are added in batches, each batch in a single transaction.
+        Every column is typed, and queries return a numpy array per column, so results can be filtered and aggregated
+        in SQL without parsing text. Alongside the rows, a RunningStats summary of the finish times of each
+        configuration is merged in with every batch, in the same transaction, so the statistics of every configuration
+        are read without scanning the runs. The summaries only count runs that reached the finish line, runs that were
+        stopped early are kept as rows with their status.
+    """
+    # Name and SQL type of each column, in the order of Driver.get_summary
+    COLUMNS = [
+        ('Seed', 'INTEGER'),
+        ('Track_Name', 'TEXT'),
+        ('Reset_Type', 'TEXT'),
+        ('Brain_Type', 'TEXT'),
+        ('Learning_Rate', 'REAL'),
+        ('Discount_Rate', 'REAL'),
+        ('Time', 'INTEGER'),
+        ('Status', 'TEXT')
+    ]
+
+    # Columns the results are grouped by when aggregating, one group per configuration
+    CONFIGURATION = ['Track_Name', 'Reset_Type', 'Brain_Type', 'Learning_Rate']
+
+    def __init__(self, file_location='output//results.db', timeout=60., relative_accuracy=.01):
+        """
+        Init function, opens the database and creates the results and aggregates tables if needed
+
+        Args:
+            file_location: str, file of the database. Defaults to output//results.db
+            timeout: float, seconds to wait for another process to release the lock before failing
+            relative_accuracy: float, relative error of the finish time quantiles of new configurations. Defaults to .01
+        """
+        self.file_location = file_location
+        self.relative_accuracy = relative_accuracy
+        self.column_names = [name for name, _ in self.COLUMNS]
+
+        directory = os.path.dirname(os.path.abspath(file_location))
+        os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(file_location, timeout=timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            columns = ', '.join(f'{name} {sql_type}' for name, sql_type in self.COLUMNS)
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS results ({columns})')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS aggregates (Track_Name TEXT, Reset_Type TEXT, '
+                                    'Brain_Type TEXT, Learning_Rate REAL, Stats TEXT, '
+                                    'PRIMARY KEY (Track_Name, Reset_Type, Brain_Type, Learning_Rate))')
+
+        # A database from before the status column only stopped runs at the old step budget of 200000
+        existing = [row[1] for row in self.connection.execute('PRAGMA table_info(results)')]
+        if 'Status' not in existing:
+            with self.connection:
+                self.connection.execute('ALTER TABLE results ADD COLUMN Status TEXT')
+                self.connection.execute("UPDATE results SET Status = CASE WHEN Time >= 200000 THEN 'step_budget' "
+                                        "ELSE 'finished' END")
+            self.rebuild_aggregates()
+
+    def save(self, rows):
+        """
+        This function adds rows to the database and merges their finish times into the aggregates, in a single
+            transaction
+
+        Args:
+            rows: list tuple, rows returned by Driver.get_summary
+        """
+        aggregator = Aggregator(self.relative_accuracy)
+        for row in rows:
+            aggregator.add(row)
+
+        # The insert takes the write lock first, so no other process changes the aggregates while they are merged
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        with self.connection:
+            self.connection.executemany(f'INSERT INTO results VALUES ({placeholders})', rows)
+            self.merge_aggregates(aggregator)
+
+    def merge_aggregates(self, aggregator):
+        """
+        This function merges the summaries of an aggregator into the aggregates. Call within a transaction that holds
+            the write lock, as save does
+
+        Args:
+            aggregator: Aggregator, summary of the finish times of each configuration
+        """
+        for configuration, running_stats in aggregator.configurations.items():
+            cursor = self.connection.execute(
+                'SELECT Stats FROM aggregates WHERE Track_Name IS ? AND Reset_Type IS ? AND Brain_Type IS ? AND '
+                'Learning_Rate IS ?', configuration)
+            stored = cursor.fetchone()
+
+            if stored is not None:
+                merged = RunningStats.from_dict(json.loads(stored[0]))
+                merged.merge(running_stats)
+                running_stats = merged
+
+            self.connection.execute('INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?)',
+                                    configuration + (json.dumps(running_stats.to_dict()),))
+
+    def rebuild_aggregates(self):
+        """
+        This function rebuilds the aggregates from every row, for a database with rows added before the aggregates
+        """
+        aggregator = Aggregator(self.relative_accuracy)
+        for row in self.connection.execute('SELECT * FROM results'):
+            aggregator.add(row)
+
+        with self.connection:
+            self.connection.execute('DELETE FROM aggregates')
+            self.merge_aggregates(aggregator)
+
+    def import_csv(self, file_location):
+        """
+        This function adds the rows of a data csv written before the database, with the header Seed, Track_Name,
+            Reset_Type, Brain_Type, Learning_Rate, Time. The discount rate was not recorded then and is left empty, and
+            the status is taken from the old step budget of 200000
+
+        Args:
+            file_location: str, file of the data csv
+
+        Returns:
+            count: int, number of rows added
+        """
+        with open(file_location, 'r', newline='') as file:
+            rows = [
+                (None if row['Seed'] == 'None' else int(row['Seed']), row['Track_Name'], row['Reset_Type'],
+                 row['Brain_Type'], float(row['Learning_Rate']), None, int(row['Time']),
+                 'step_budget' if int(row['Time']) >= 200000 else 'finished')
+                for row in csv.DictReader(file)
+            ]
+
+        self.save(rows)
+        return len(rows)
+
+    def query(self, columns=None, **filters):
+        """
+        This function returns the results matching the filters
+
+        Args:
+            columns: list str, optional columns to return. Defaults to every column
+            filters: value each column must equal, keyed by column name, for example Track_Name='R'
+
+        Returns:
+            results: dict, numpy array of each column keyed by name, one entry per run
+        """
+        columns = columns if columns is not None else self.column_names
+        self.check_columns(columns)
+
+        where, parameters = self.get_where(filters)
+        cursor = self.connection.execute(f'SELECT {", ".join(columns)} FROM results{where}', parameters)
+
+        return self.to_arrays(columns, cursor.fetchall())
+
+    def aggregate(self, group_by=None, status='finished', **filters):
+        """
+        This function returns the number of runs and the mean, minimum and maximum time of each group of results
+            matching the filters, computed by the database. By default only runs that reached the finish line are
+            counted, the same runs as get_statistics, as the time of a run stopped early is not a finish time
+
+        Args:
+            group_by: list str, optional columns to group by. Defaults to the configuration columns
+            status: str, status of the runs to count. Defaults to 'finished'. Use None to count every run, grouped by
+                Status to tell them apart
+            filters: value each column must equal, keyed by column name, for example Track_Name='R'
+
+        Returns:
+            results: dict, numpy array of each group column and of Runs, Mean_Time, Min_Time and Max_Time keyed by name,
+                one entry per group
+        """
+        group_by = group_by if group_by is not None else self.CONFIGURATION
+        self.check_columns(group_by)
+        if status is not None:
+            filters['Status'] = status
+
+        where, parameters = self.get_where(filters)
+        groups = ', '.join(group_by)
+        cursor = self.connection.execute(
+            f'SELECT {groups}, COUNT(*), AVG(Time), MIN(Time), MAX(Time) FROM results{where} '
+            f'GROUP BY {groups} ORDER BY {groups}', parameters)
+
+        return self.to_arrays(group_by + ['Runs', 'Mean_Time', 'Min_Time', 'Max_Time'], cursor.fetchall())
+
+    def get_aggregator(self, **filters):
+        """
+        This function returns the summaries of the configurations matching the filters, read from the aggregates
+
+        Args:
+            filters: value each configuration column must equal, keyed by column name, for example Track_Name='R'
+
+        Returns:
+            aggregator: Aggregator, summary of the finish times of each configuration
+        """
+        for name in filters:
+            if name not in self.CONFIGURATION:
+                raise ValueError(f'Aggregates column {name} not found, '
+                                 f'please use one of {", ".join(self.CONFIGURATION)}')
+
+        where, parameters = self.get_where(filters)
+        aggregator = Aggregator(self.relative_accuracy)
+        for row in self.connection.execute(f'SELECT * FROM aggregates{where}', parameters):
+            aggregator.configurations[tuple(row[:4])] = RunningStats.from_dict(json.loads(row[4]))
+
+        return aggregator
+
+    def get_statistics(self, quantiles=(.5, .9, .99), **filters):
+        """
+        This function returns the finish time statistics of each configuration matching the filters, read from the
+            aggregates without scanning the runs. Only runs that reached the finish line are counted
+
+        Args:
+            quantiles: tuple float, quantiles of the finish time to estimate. Defaults to the median, 90th and 99th
+                percentiles
+            filters: value each configuration column must equal, keyed by column name, for example Track_Name='R'
+
+        Returns:
+            statistics: dict, numpy array of each configuration column and of Runs, Mean_Time, Std_Time, Min_Time,
+                Max_Time and a P<percentile>_Time per quantile keyed by name, one entry per configuration
+        """
+        quantile_names = [f'P{quantile * 100:g}_Time' for quantile in quantiles]
+        columns = self.CONFIGURATION + ['Runs', 'Mean_Time', 'Std_Time', 'Min_Time', 'Max_Time'] + quantile_names
+
+        rows = []
+        for configuration, running_stats in sorted(self.get_aggregator(**filters).configurations.items()):
+            rows.append(configuration + (running_stats.count, running_stats.mean,
+                                         running_stats.get_standard_deviation(), running_stats.minimum,
+                                         running_stats.maximum) +
+                        tuple(running_stats.get_quantile(quantile) for quantile in quantiles))
+
+        return self.to_arrays(columns, rows)
+
+    def get_where(self, filters):
+        """
+        This function builds the where clause of a query from the filters
+
+        Args:
+            filters: dict, value each column must equal, keyed by column name
+
+        Returns:
+            where: str, where clause, empty without filters
+            parameters: list, value of each placeholder in the where clause
+        """
+        self.check_columns(filters)
+        if not filters:
+            return '', []
+
+        where = ' WHERE ' + ' AND '.join(f'{name} IS ?' for name in filters)
+        return where, list(filters.values())
+
+    def check_columns(self, columns):
+        """
+        This function checks every column is a column of the results table, as column names are put into the SQL
+
+        Args:
+            columns: list str, column names to check
+        """
+        for name in columns:
+            if name not in self.column_names:
+                raise ValueError(f'Results column {name} not found, please use one of {", ".join(self.column_names)}')
+
+    @staticmethod
+    def to_arrays(columns, rows):
+        """
+        This function turns rows into a numpy array per column
+
+        Args:
+            columns: list str, name of each column in the rows
+            rows: list tuple, rows returned by the database
+
+        Returns:
+            results: dict, numpy array of each column keyed by name
+        """
+        if not rows:
+            return {name: np.array([]) for name in columns}
+
+        return {name: np.array(values) for name, values in zip(columns, zip(*rows))}
+
+    def close(self):
+        """
+        This function closes the database connection
+        """
+        self.connection.close()
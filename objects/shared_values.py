@@ -0,0 +1,98 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedValues:
+    """
+    Class SharedValues which publishes converged value matrices into shared memory
+
+    The value matrix only depends on the track and the value iteration parameters, so it is solved once, published
+        here and attached by every worker process without copying. Attached matrices are read only, a driver copies them
+        into its own action selection table before learning.
+    """
+    def __init__(self):
+        """
+        Init function, starts with no published value matrices
+        """
+        # Shared memory blocks owned by this object and where to find them, keyed by get_values_key
+        self.blocks = {}
+        self.descriptors = {}
+
+    def publish(self, key, values):
+        """
+        This function copies a value matrix into a new shared memory block
+
+        Args:
+            key: str, key of the value matrix, see get_values_key
+            values: numpy float array (x, y), or list of lists, converged value matrix
+
+        Returns:
+            descriptor: tuple (str, tuple, str), the block name, shape and dtype needed to attach to the matrix
+        """
+        values = np.asarray(values, dtype=float)
+
+        # Create the block and copy the values in
+        block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+
+        self.blocks[key] = block
+        self.descriptors[key] = (block.name, values.shape, values.dtype.str)
+        return self.descriptors[key]
+
+    def get_descriptors(self):
+        """
+        This function returns where to find every published value matrix, to pass on to the worker processes
+
+        Returns:
+            descriptors: dict, descriptor of each value matrix keyed by get_values_key
+        """
+        return dict(self.descriptors)
+
+    def close(self):
+        """
+        This function releases and removes every published shared memory block
+        """
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+
+        self.blocks = {}
+        self.descriptors = {}
+
+
+def attach_values(descriptor):
+    """
+    Function to attach to a published value matrix without copying it
+
+    Args:
+        descriptor: tuple (str, tuple, str), returned by SharedValues.publish
+
+    Returns:
+        values: numpy float array (x, y), read only view of the shared value matrix
+        block: SharedMemory, the attached block, which must be kept alive for as long as the values are used
+    """
+    name, shape, dtype = descriptor
+
+    # The publisher owns the block and removes it, workers only attach
+    block = shared_memory.SharedMemory(name=name)
+
+    values = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    values.flags.writeable = False
+    return values, block
+
+
+def get_values_key(track_name, discount_rate, convergence_delta, value_engine, value_init='zeros'):
+    """
+    Function to create the key of a value matrix from everything it depends on
+
+    Args:
+        track_name: char, letter of the track
+        discount_rate: float, rate at which value iteration is discounted as time goes up
+        convergence_delta: float, threshold to stop value iteration
+        value_engine: str, value iteration engine
+        value_init: str, starting values of value iteration. Defaults to 'zeros'
+
+    Returns:
+        key: str, key of the value matrix
+    """
+    return f'{track_name}_{discount_rate!r}_{convergence_delta!r}_{value_engine}_{value_init}'
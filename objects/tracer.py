@@ -0,0 +1,71 @@
+from collections import deque
+
+
+class Tracer:
+    """
+    Class Tracer which records what the car does at each step
+
+    Tracing is off by default, and the car only checks the enabled attribute before doing any work, so a disabled
+        tracer costs a single attribute lookup per step. When enabled, each step is kept in a ring buffer of the last
+        steps for crash debugging and can also be written to a file through a buffered sink.
+    """
+    # Trace levels
+    OFF = 0
+    STEP = 1
+    DETAIL = 2
+
+    def __init__(self, level=0, buffer_steps=1000, file_location=None, file_buffer=1 << 20):
+        """
+        Init function, takes a trace level and where the traced steps should go
+
+        Args:
+            level: int, trace level. Use 0 for off, 1 for a line per step, or 2 to also include the positions and track
+                types passed over at each step. Defaults to 0
+            buffer_steps: int, number of the most recent steps to keep in memory. Use 0 to keep none
+            file_location: str, optional file to write every traced step to
+            file_buffer: int, size in bytes of the write buffer for the file
+        """
+        if level not in [self.OFF, self.STEP, self.DETAIL]:
+            raise ValueError("Trace level not found, please specify 0, 1, or 2")
+
+        # Level flags, checked by the car before tracing
+        self.level = level
+        self.enabled = level > self.OFF
+        self.detailed = level >= self.DETAIL
+
+        # Ring buffer of the last steps
+        self.steps = deque(maxlen=buffer_steps)
+
+        # Optional file sink
+        self.file = None
+        if self.enabled and file_location is not None:
+            self.file = open(file_location, 'w', buffering=file_buffer)
+
+    def trace(self, message):
+        """
+        This function records a single step
+
+        Args:
+            message: str, description of the step
+        """
+        self.steps.append(message)
+
+        if self.file is not None:
+            self.file.write(message + '\n')
+
+    def get_steps(self):
+        """
+        This function returns the most recent steps kept in the ring buffer
+
+        Returns:
+            steps: list str, the last steps traced, oldest first
+        """
+        return list(self.steps)
+
+    def close(self):
+        """
+        This function flushes and closes the file sink, if there is one
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,12 +1,26 @@
-from random import choice
+import random
+import numpy as np
+from objects.movement import MovementTable
 
 
 class Track:
     """
     Class track to keep track of the environment of the objects
 
-    This class implements a board and has the ability to return the type of position given a tuple
+    This class implements a board and has the ability to return the type of position given a tuple. The board is kept
+        as a compact uint8 grid of track codes, padded with walls wide enough for a full max velocity move so that every
+        lookup from the track stays in range
     """
+    # Track codes used in the grid, and the character for each code
+    WALL = 0
+    TRACK = 1
+    START = 2
+    FINISH = 3
+    TRACK_TYPES = '#.SF'
+
+    # Width of the wall border around the grid, the max velocity of the car
+    PADDING = 5
+
     def __init__(self, track_name='R'):
         """
         Creates a track, pass a char to pick one of the tracks located in the data folder.
@@ -18,17 +32,27 @@ class Track:
         self.track_name = track_name
 
         # Meta data and read data
+        self.file_location = None
         self.x = 0
         self.y = 0
         self.track_data = []
         self.read_data()
 
         # Update and create track
-        self.track = None
+        self.grid = None
         self.start_positions = None
         self.finish_positions = None
+        self.start_indices = None
+        self.finish_indices = None
         self.create_track()
 
+        # Step distance of every position from the finish line
+        self.finish_distances = None
+        self.create_finish_distances()
+
+        # Outcome of every movement, created on first use
+        self.movement_table = None
+
     def read_data(self):
         """
         This function reads data from the specified track name and sets the track size and saves the data read
@@ -36,6 +60,7 @@ class Track:
         # Create file name and location
         file_name = self.track_name + '-track.txt'
         file_location = f'data//{file_name}'
+        self.file_location = file_location
 
         # Attempt to read file, raise error if wrong track name specified
         try:
@@ -61,48 +86,100 @@ class Track:
 
     def create_track(self):
         """
-        This functions handles parsing the main data and reading that into a matrix for accessing using a tuple
+        This functions handles parsing the main data and reading that into a padded grid of track codes for accessing
+            using a tuple
         """
-        # Empty variables for holding the track, last_position positions, and finish positions
-        track = []
-        start_positions = []
-        finish_positions = []
+        # Lookup from character to track code, anything that isn't a wall, start or finish is open track
+        codes = np.full(256, self.TRACK, dtype=np.uint8)
+        for code, track_type in enumerate(self.TRACK_TYPES):
+            codes[ord(track_type)] = code
 
-        # Loop through the rows of the matrix and read each lines
-        for x_index in range(self.x):
+        # After reading all of the lines, check size of x, raise an error if there's a mismatch
+        if len(self.track_data) < self.x:
+            raise ValueError(f'Track does not match size {self.x}')
 
-            # Grab the current row, drop last character as that is the new line character and convert string to a list
-            track_row = list(self.track_data[x_index])[:-1]
+        # Empty grid, everything starts as a wall so the border is already set
+        padding = self.PADDING
+        grid = np.full((self.x + 2 * padding, self.y + 2 * padding), self.WALL, dtype=np.uint8)
 
-            # Loop through the columns of the matrix
-            for y_index in range(self.y):
-                # If this is a last_position position, save current (x_index, y_index)
-                if track_row[y_index] == 'S':
-                    start_positions.append((x_index, y_index))
+        # Loop through the rows of the matrix and read each lines
+        for x_index in range(self.x):
 
-                # If this is a finish position, save current (x_index, y_index)
-                elif track_row[y_index] == 'F':
-                    finish_positions.append((x_index, y_index))
+            # Grab the current row, drop last character as that is the new line character
+            track_row = self.track_data[x_index][:-1]
 
             # If we have too many columns, raise an error as there was a problem with parsing
             if len(track_row) != self.y:
                 raise ValueError(f'Track row {x_index} does not match size {self.y}')
 
-            # Append the list to the track
-            track.append(track_row)
-
-        # After appending all of the lists, check size of x, raise an error if there's a mismatch
-        if len(track) != self.x:
-            raise ValueError(f'Track does not match size {self.x}')
+            # Convert the row into track codes
+            grid[x_index + padding, padding:padding + self.y] = codes[np.frombuffer(track_row.encode(), np.uint8)]
 
         # Save our variables
-        self.track = track
-        self.start_positions = start_positions
-        self.finish_positions = finish_positions
+        self.grid = grid
+
+        # Start and finish positions, as index arrays and as lists of (x_index, y_index)
+        self.start_indices = np.argwhere(self.get_track_grid() == self.START)
+        self.finish_indices = np.argwhere(self.get_track_grid() == self.FINISH)
+        self.start_positions = [tuple(position) for position in self.start_indices.tolist()]
+        self.finish_positions = [tuple(position) for position in self.finish_indices.tolist()]
+
+    def create_finish_distances(self):
+        """
+        This function runs a breadth first search from every finish position at once through the open track, moving to
+            any of the 8 neighbours of a position, the same moves as value iteration. Each level of the search is
+            expanded as a whole with numpy, over flat indices into the padded grid, so the wall border keeps every
+            neighbour in range
+        """
+        padding = self.PADDING
+        grid = self.grid.ravel()
+        open_positions = grid != self.WALL
+
+        # Flat offsets of the 8 neighbours
+        width = self.grid.shape[1]
+        offsets = np.array([x_action * width + y_action for x_action in [-1, 0, 1] for y_action in [-1, 0, 1]
+                            if x_action != 0 or y_action != 0])
+
+        # Start from every finish position at distance 0, -1 is not reached
+        distances = np.full(grid.size, -1, dtype=np.int32)
+        frontier = np.flatnonzero(grid == self.FINISH)
+        distances[frontier] = 0
+
+        # Expand the search a level at a time until no new positions are reached
+        distance = 0
+        while frontier.size:
+            distance += 1
+            neighbours = (frontier[:, None] + offsets[None, :]).ravel()
+            neighbours = np.unique(neighbours[open_positions[neighbours] & (distances[neighbours] < 0)])
+            distances[neighbours] = distance
+            frontier = neighbours
+
+        self.finish_distances = distances.reshape(self.grid.shape)[padding:-padding, padding:-padding]
+
+    def get_finish_distances(self):
+        """
+        This function returns the step distance of every position from the finish line
+
+        Returns:
+            distances: numpy int32 array (x, y), fewest moves to any finish position through open track, moving to
+                any of the 8 neighbours each move. -1 for walls and positions that can't reach the finish line
+        """
+        return self.finish_distances
+
+    def get_track_grid(self):
+        """
+        This function returns the track codes of the track without the wall border
+
+        Returns:
+            grid: numpy uint8 array (x, y), track code at each position, a view of the padded grid
+        """
+        padding = self.PADDING
+        return self.grid[padding:padding + self.x, padding:padding + self.y]
 
     def get_track_position(self, position):
         """
-        This function returns the track position of a specified tuple
+        This function returns the track position of a specified tuple. Positions outside of the track fall on the wall
+            border and return a # to denote a crash
 
         Args:
             position: tuple (int, int), the first int is for X/Rows, the second for Y/Columns on a matrix
@@ -110,19 +187,48 @@ class Track:
         Returns:
             string: string, the character at that position
         """
-        # Retrieve track
-        try:
-            return self.track[position[0]][position[1]]
-        # If out of bounds, return a # to denote a crash
-        except IndexError:
-            return '#'
+        return self.TRACK_TYPES[self.grid[position[0] + self.PADDING, position[1] + self.PADDING]]
+
+    def get_track_positions(self, positions):
+        """
+        This function returns the track codes for many positions at once. Positions outside of the track are clipped
+            onto the wall border
+
+        Args:
+            positions: numpy int array (n, 2), the first column is for X/Rows, the second for Y/Columns on a matrix
+
+        Returns:
+            codes: numpy uint8 array (n), the track code at each position
+        """
+        positions = np.asarray(positions)
+        x_index = np.clip(positions[..., 0] + self.PADDING, 0, self.grid.shape[0] - 1)
+        y_index = np.clip(positions[..., 1] + self.PADDING, 0, self.grid.shape[1] - 1)
+        return self.grid[x_index, y_index]
 
-    def get_start_position(self):
+    def get_start_position(self, rng=None):
         """
         This function returns a random last_position position for the track. There are multiple last_position positions
             so we return one randomly
 
+        Args:
+            rng: RandomStream, optional random number stream to pick with. Defaults to the global random module
+
         Returns:
             tuple: tuple (int, int), randomly picked tuple location of a last_position position
         """
-        return choice(self.start_positions)
+        if rng is None:
+            rng = random
+
+        return rng.choice(self.start_positions)
+
+    def get_movement_table(self):
+        """
+        This function returns the movement table for the track, which holds the crash and finish outcome of moving from
+            every drivable position with every velocity. The table is created the first time it is requested
+
+        Returns:
+            movement_table: MovementTable, outcomes of every movement on this track
+        """
+        if self.movement_table is None:
+            self.movement_table = MovementTable(self)
+        return self.movement_table
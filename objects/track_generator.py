@@ -0,0 +1,92 @@
+import random
+import numpy as np
+
+
+def generate_track(x, y, corridor_width=5, turns=4, rng=None):
+    """
+    Function to generate a random winding track of any size
+
+    The track is a single corridor snaking down the grid. It runs along horizontal legs that alternate between heading
+        right and left, each in its own band of rows with walls in between, joined at the ends by vertical legs. Every
+        join adds 2 turns. An odd number of turns ends on a vertical leg down into an extra band at the bottom. The
+        start line crosses the first leg and the finish line the last one, both as wide as the corridor. The row of
+        each leg and the columns where it turns are picked at random
+
+    Args:
+        x: int, number of rows
+        y: int, number of columns
+        corridor_width: int, width of the corridor. Defaults to 5, the same as the tracks in data
+        turns: int, number of turns along the corridor. Defaults to 4
+        rng: random.Random, optional random number generator. Defaults to the global random module
+
+    Returns:
+        grid: numpy uint8 array (x, y), the character at each position
+    """
+    if rng is None:
+        rng = random
+
+    if corridor_width < 1 or turns < 0:
+        raise ValueError('Corridor width must be at least 1 and turns at least 0')
+
+    # Horizontal legs, and a band for the last vertical leg if the turns are odd
+    legs = turns // 2 + 1
+    bands = legs + turns % 2
+    band_height = (x - 2) // bands
+
+    # Each band needs room for the corridor and a wall under it, and each leg room to turn at both ends
+    if band_height < corridor_width + 1 or y - 2 < 4 * corridor_width:
+        raise ValueError(f'Track of size {x},{y} is too small for a corridor width of {corridor_width} with '
+                         f'{turns} turns')
+
+    grid = np.full((x, y), ord('#'), dtype=np.uint8)
+
+    # Top row of each leg, inside its band
+    rows = [1 + band * band_height + rng.randint(0, band_height - corridor_width - 1) for band in range(legs)]
+
+    # Column where each leg turns, alternating between the left and right quarter of the track
+    quarter = (y - 2) // 4
+    left_columns = (1, 1 + quarter - corridor_width)
+    right_columns = (y - 1 - quarter, y - 1 - corridor_width)
+    columns = [rng.randint(*left_columns) if leg % 2 == 0 else rng.randint(*right_columns) for leg in range(legs + 1)]
+
+    for leg in range(legs):
+        # Horizontal leg, from its first turn column to its last
+        first, last = sorted([columns[leg], columns[leg + 1]])
+        grid[rows[leg]:rows[leg] + corridor_width, first:last + corridor_width] = ord('.')
+
+        # Vertical leg down to the next horizontal leg
+        if leg + 1 < legs:
+            column = columns[leg + 1]
+            grid[rows[leg]:rows[leg + 1] + corridor_width, column:column + corridor_width] = ord('.')
+
+    # Start line across the first leg
+    grid[rows[0]:rows[0] + corridor_width, columns[0]] = ord('S')
+
+    # Finish line across the end of the last leg, or at the bottom of the last vertical leg for odd turns
+    end_row = rows[-1]
+    end_column = columns[legs]
+    if turns % 2 == 0:
+        if legs % 2 == 1:
+            end_column += corridor_width - 1
+        grid[end_row:end_row + corridor_width, end_column] = ord('F')
+    else:
+        grid[end_row:x - 1, end_column:end_column + corridor_width] = ord('.')
+        grid[x - 2, end_column:end_column + corridor_width] = ord('F')
+
+    return grid
+
+
+def write_track(file_location, grid):
+    """
+    Function to write a generated track in the format of the tracks in data, a size line and then one line per row
+
+    Args:
+        file_location: str, location of the track file
+        grid: numpy uint8 array (x, y), the character at each position, see generate_track
+    """
+    lines = np.full((grid.shape[0], grid.shape[1] + 1), ord('\n'), dtype=np.uint8)
+    lines[:, :-1] = grid
+
+    with open(file_location, 'wb') as file:
+        file.write(f'{grid.shape[0]},{grid.shape[1]}\n'.encode())
+        file.write(lines.tobytes())
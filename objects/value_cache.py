@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+
+class ValueCache:
+    """
+    Class ValueCache which keeps converged value matrices on disk between runs
+
+    A value matrix only depends on the contents of the track file, the discount_rate, the convergence_delta and the
+        value engine, so each matrix is saved as a .npy file named by a hash of those. Entries are loaded memory mapped,
+        written atomically so concurrent runs never see a partial file, and the least recently used entries are evicted
+        once the directory grows past its size cap.
+    """
+    def __init__(self, directory='cache', max_bytes=256 * 1024 * 1024):
+        """
+        Init function, takes the cache directory and its size cap. The directory is created if needed
+
+        Args:
+            directory: str, directory holding the cached value matrices. Defaults to 'cache'
+            max_bytes: int, size cap of the directory in bytes. Defaults to 256 MB
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, track, discount_rate, convergence_delta, value_engine, value_init='zeros'):
+        """
+        This function hashes everything a value matrix depends on into its cache key
+
+        Args:
+            track: track, track object read in from data
+            discount_rate: float, rate at which value iteration is discounted as time goes up
+            convergence_delta: float, threshold to stop value iteration
+            value_engine: str, value iteration engine
+            value_init: str, starting values of value iteration. Defaults to 'zeros'
+
+        Returns:
+            key: str, hex digest naming the cache entry
+        """
+        digest = hashlib.sha256()
+
+        # Track contents
+        with open(track.file_location, 'rb') as file:
+            digest.update(file.read())
+
+        # Value iteration parameters
+        digest.update(f'{discount_rate!r},{convergence_delta!r},{value_engine}'.encode())
+        if value_init != 'zeros':
+            digest.update(f',{value_init}'.encode())
+
+        return digest.hexdigest()
+
+    def get_file_location(self, key):
+        """
+        This function returns where the entry for a key is saved
+
+        Args:
+            key: str, cache key from get_key
+
+        Returns:
+            file_location: str, path of the .npy file
+        """
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def load(self, key):
+        """
+        This function loads a cached value matrix, memory mapped and read only
+
+        Args:
+            key: str, cache key from get_key
+
+        Returns:
+            values: numpy float array (x, y), the cached value matrix, or None if there is no entry
+        """
+        file_location = self.get_file_location(key)
+
+        try:
+            values = np.load(file_location, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(file_location)
+        except FileNotFoundError:
+            pass
+
+        return values
+
+    def save(self, key, values):
+        """
+        This function saves a value matrix. The file is written under a temporary name and then renamed into place, so
+            readers only ever see a complete entry. Old entries are evicted afterwards if needed
+
+        Args:
+            key: str, cache key from get_key
+            values: numpy float array (x, y), or list of lists, converged value matrix
+        """
+        file_descriptor, temporary_location = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                np.save(file, np.asarray(values, dtype=float))
+            os.replace(temporary_location, self.get_file_location(key))
+        except BaseException:
+            os.remove(temporary_location)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """
+        This function removes the least recently used entries until the directory is within its size cap
+        """
+        # Every entry with its last use and size
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        # Remove the oldest first
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, file_location in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+
+            try:
+                os.remove(file_location)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
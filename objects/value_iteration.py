@@ -0,0 +1,185 @@
+from heapq import heappop, heappush
+import numpy as np
+
+
+def iterate_values(walls, finishes, discount_rate=.9, convergence_delta=.001, values=None):
+    """
+    Vectorized value iteration over a whole track grid
+
+    Each sweep takes the max over the padded 3x3 neighbourhood of every cell at once. Cells outside of the grid are
+        worth -100, walls are held at -100 and the finish line is held at 0, the same as the loop engine in Driver. The
+        sweeps stop once no cell changes by more than the convergence_delta.
+
+    Args:
+        walls: numpy bool array (x, y), True where the track is a wall
+        finishes: numpy bool array (x, y), True where the track is a finish position
+        discount_rate: float, rate at which value iteration is discounted as time goes up
+        convergence_delta: float, threshold to stop value iteration
+        values: numpy float array (x, y), optional starting values. Defaults to 0 everywhere
+
+    Returns:
+        values: numpy float array (x, y), converged value matrix
+        sweeps: int, number of sweeps made over the grid
+    """
+    # Starting values, 0 unless a warm start was passed
+    if values is None:
+        values = np.zeros(walls.shape)
+    else:
+        values = np.array(values, dtype=float)
+
+    # Apply the masks before the first sweep
+    values[walls] = -100
+    values[finishes] = 0
+
+    # Padded matrix, anything out of bounds is -inf so that it never beats the -100 floor below
+    padded = np.full((walls.shape[0] + 2, walls.shape[1] + 2), -np.inf)
+
+    # Loop while not converged
+    sweeps = 0
+    while True:
+        sweeps += 1
+        padded[1:-1, 1:-1] = values
+
+        # Our initial max_value is -100, take the best neighbour out of all 9 actions
+        max_values = np.full(walls.shape, -100.0)
+        for x_action in [-1, 0, 1]:
+            for y_action in [-1, 0, 1]:
+                neighbours = padded[1 + x_action:padded.shape[0] - 1 + x_action,
+                                    1 + y_action:padded.shape[1] - 1 + y_action]
+                np.maximum(max_values, -1 + (discount_rate * neighbours), out=max_values)
+
+        # Walls and the finish line keep their fixed values
+        max_values[walls] = -100
+        max_values[finishes] = 0
+
+        # Check for convergence
+        delta = np.abs(max_values - values).max()
+        values = max_values
+        if delta < convergence_delta:
+            break
+
+    return values, sweeps
+
+
+def prioritize_values(walls, finishes, discount_rate=.9, convergence_delta=.001, values=None):
+    """
+    Prioritized asynchronous value iteration over a whole track grid
+
+    Backups are made one cell at a time and in place, from a priority queue seeded with the neighbours of the finish
+        line. Every other cell starts at the value of never finishing, so values only go up and changes spread outward
+        from the finish line. Cells are queued by their Bellman residual, ties broken by their step distance from the
+        finish line, and only the neighbours of a cell that changed by more than the convergence_delta are checked
+        again. Cells outside of the grid, walls and the finish line are treated the same as in iterate_values. With a
+        warm start the queue is seeded with every open cell whose residual is over the convergence_delta instead.
+
+    Args:
+        walls: numpy bool array (x, y), True where the track is a wall
+        finishes: numpy bool array (x, y), True where the track is a finish position
+        discount_rate: float, rate at which value iteration is discounted as time goes up
+        convergence_delta: float, threshold to stop value iteration
+        values: numpy float array (x, y), optional starting values. Defaults to the value of never finishing
+
+    Returns:
+        values: numpy float array (x, y), converged value matrix
+        backups: int, number of Bellman backups made, including the ones that only checked a residual
+    """
+    # Value of never finishing, -1 every step forever, but never below the -100 of a wall
+    if discount_rate < 1:
+        start_value = max(-100., -1 / (1 - discount_rate))
+    else:
+        start_value = -100.
+
+    # Padded matrix as a flat list, anything out of bounds is -inf so that it never beats the -100 floor below
+    padded = np.full((walls.shape[0] + 2, walls.shape[1] + 2), -np.inf)
+    padded[1:-1, 1:-1] = np.where(walls, -100., np.where(finishes, 0., start_value if values is None else values))
+    warm_start = values is not None
+    values = padded.ravel().tolist()
+
+    # Only the open cells are backed up, walls and the finish line keep their fixed values
+    open_cells = np.zeros(padded.shape, dtype=bool)
+    open_cells[1:-1, 1:-1] = ~walls & ~finishes
+    open_cells = open_cells.ravel().tolist()
+    finish_cells = np.zeros(padded.shape, dtype=bool)
+    finish_cells[1:-1, 1:-1] = finishes
+
+    # Flat offsets of the 9 actions, and of the 8 neighbours that can move the car into a cell
+    width = padded.shape[1]
+    offsets = [x_action * width + y_action for x_action in [-1, 0, 1] for y_action in [-1, 0, 1]]
+    neighbour_offsets = [offset for offset in offsets if offset != 0]
+
+    # Seed the queue with the neighbours of the finish line, treating the finish line as changed at distance 0
+    queue = []
+    changed = [(index, 0) for index in np.flatnonzero(finish_cells).tolist()]
+    backups = 0
+
+    # A warm start can be off anywhere, seed the queue with the residual of every open cell instead
+    if warm_start:
+        changed = []
+        for index in np.flatnonzero(open_cells).tolist():
+            backups += 1
+            value = max(-100., -1 + discount_rate * max([values[index + offset] for offset in offsets]))
+            residual = value - values[index]
+            if abs(residual) > convergence_delta:
+                heappush(queue, (-abs(residual), 0, index))
+
+    # Loop while cells are changing
+    while True:
+        for index, distance in changed:
+            # Check the residual of every open neighbour, queue the ones that are off by more than the convergence_delta
+            for neighbour_offset in neighbour_offsets:
+                neighbour = index + neighbour_offset
+                if not open_cells[neighbour]:
+                    continue
+
+                backups += 1
+                value = max(-100., -1 + discount_rate * max([values[neighbour + offset] for offset in offsets]))
+                residual = value - values[neighbour]
+                if abs(residual) > convergence_delta:
+                    heappush(queue, (-abs(residual), distance + 1, neighbour))
+        changed = []
+
+        # Back up the cell with the largest residual. Cells can be queued more than once, so the backup is made again
+        while queue and not changed:
+            _, distance, index = heappop(queue)
+
+            backups += 1
+            value = max(-100., -1 + discount_rate * max([values[index + offset] for offset in offsets]))
+            if abs(value - values[index]) > convergence_delta:
+                values[index] = value
+                changed = [(index, distance)]
+
+        if not changed:
+            break
+
+    values = np.array(values).reshape(padded.shape)[1:-1, 1:-1]
+
+    return values, backups
+
+
+def get_distance_values(distances, discount_rate=.9):
+    """
+    Function to turn the step distance of every position from the finish line into starting values for value iteration
+
+    Moving costs -1 and every step is discounted, so a position d steps from the finish line is worth
+        -(1 - discount_rate ** d) / (1 - discount_rate) if it takes the shortest path, the fixed point of value
+        iteration. Positions that can't reach the finish line are worth the value of never finishing. Values never go
+        below the -100 of a wall.
+
+    Args:
+        distances: numpy int array (x, y), step distance from the finish line, -1 where it can't be reached, see
+            Track.get_finish_distances
+        discount_rate: float, rate at which value iteration is discounted as time goes up
+
+    Returns:
+        values: numpy float array (x, y), starting values
+    """
+    if discount_rate < 1:
+        values = -(1 - discount_rate ** distances.astype(float)) / (1 - discount_rate)
+        never_finishing = -1 / (1 - discount_rate)
+    else:
+        values = -distances.astype(float)
+        never_finishing = -100.
+
+    values[distances < 0] = never_finishing
+    return np.maximum(values, -100.)
+
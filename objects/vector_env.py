@@ -0,0 +1,128 @@
+import numpy as np
+from objects.random_stream import RandomStream
+
+
+class VectorCarEnv:
+    """
+    Class VectorCarEnv which drives many cars on the same track at once
+
+    The positions, velocities, failed accelerations and finished flags of all cars are held in numpy arrays, and a
+        single step applies the same rules as Car to every car. Each car owns its own random number stream, used in the
+        same order as a standalone Car, so each car follows the same trajectory as a Car given the same stream and
+        actions.
+    """
+    def __init__(self, track, reset_type='S', n_cars=1, rngs=None, max_steps=200000):
+        """
+        Init function, takes a track, a reset_type and the number of cars. Each car retrieves a start position from the
+            track, the same way as a Car
+
+        Args:
+            track: track, track object with a track read in from data
+            reset_type: char, defines the rest type. Default is 'S', which stops the car, sets velocity to (0, 0), and
+                increments time by 1. Use 'R' to have a hard rest to the start position
+            n_cars: int, number of cars to drive
+            rngs: list RandomStream, optional random number stream for each car. Defaults to a new stream per car
+            max_steps: int, step budget of each car, a car stops once its time reaches it. Defaults to 200000
+        """
+        # Track
+        self.track = track
+        self.movement_table = track.get_movement_table()
+
+        # Car meta variables - reset type
+        if reset_type not in ['S', 'R']:
+            raise ValueError("Car Reset type not found, Please specify 'S' or 'R'")
+        else:
+            self.reset_type = reset_type
+
+        # Random number streams, one per car
+        if rngs is None:
+            rngs = [RandomStream() for _ in range(n_cars)]
+        elif len(rngs) != n_cars:
+            raise ValueError(f'Number of random number streams does not match n_cars {n_cars}')
+        self.rngs = rngs
+        self.n_cars = n_cars
+        self.max_steps = max_steps
+
+        # Position variables for start and current. Resets to start if reset is 'R'
+        self.start_positions = np.array([track.get_start_position(rng) for rng in self.rngs], dtype=np.int64)
+        self.positions = self.start_positions.copy()
+
+        # Movement variables & acceleration status
+        self.time = np.zeros(n_cars, dtype=np.int64)
+        self.velocities = np.zeros((n_cars, 2), dtype=np.int64)
+        self.accelerations = np.zeros((n_cars, 2), dtype=np.int64)
+        self.acceleration_status = np.ones((n_cars, 2), dtype=bool)
+        self.finished = np.zeros(n_cars, dtype=bool)
+
+    def step(self, actions):
+        """
+        Step function. Main function for driving all of the cars
+
+        Each car that hasn't finished accelerates, following the rules of Car.accelerate. Accelerations are bounded to
+            {-1, 0, 1} and fail with a 20% chance unless the car is braking on that axis. Velocity is then capped at 5,
+            the movement is checked for crashes and finishes, and crashed cars are stopped and reset based on the reset
+            type. Finished cars are left as they are.
+
+        Args:
+            actions: numpy int array (n_cars, 2), acceleration for each car, 0 index for x and 1 index for y
+
+        Returns:
+            crashed: numpy bool array (n_cars), flag if each car crashed during this step
+            finished: numpy bool array (n_cars), flag if each car has reached the finish line
+        """
+        active = ~self.get_finish()
+
+        # Check bounds and convert if needed
+        actions = np.asarray(actions)
+        accelerations = np.where(actions >= 1, 1, np.where(actions <= -1, -1, 0))
+
+        # Failure can only occur when the acceleration is not a break
+        can_fail = (accelerations * self.velocities >= 0) & (accelerations != 0) & active[:, None]
+
+        # Roll for failures, x then y, with each car's own stream
+        status = np.ones((self.n_cars, 2), dtype=bool)
+        for car in np.flatnonzero(can_fail.any(axis=1)):
+            rng = self.rngs[car]
+            for axis in [0, 1]:
+                if can_fail[car, axis] and rng.roll_failure():
+                    status[car, axis] = False
+        accelerations = accelerations * status
+
+        # Save acceleration results and the status for the cars that moved
+        self.accelerations[active] = accelerations[active]
+        self.acceleration_status[active] = status[active]
+
+        # Update velocity, capped at 5 in each direction
+        velocities = np.clip(self.velocities + accelerations, -5, 5)
+
+        # Look up the outcome of each movement
+        cells = self.movement_table.cell_index[self.positions[:, 0], self.positions[:, 1]]
+        velocity_index = (velocities[:, 0] + 5) * 11 + (velocities[:, 1] + 5)
+        crashed = self.movement_table.crashed[cells, velocity_index] & active
+        finished = self.movement_table.finished[cells, velocity_index] & active
+
+        # Increment time
+        self.time[active] += 1
+        self.finished |= finished
+
+        # Move the cars that didn't crash or finish
+        moved = active & ~crashed & ~finished
+        self.velocities[active] = velocities[active]
+        self.positions[moved] += velocities[moved]
+
+        # Stop the cars that crashed, and move them back to the start if reset
+        reset = crashed & ~finished
+        self.velocities[reset] = 0
+        if self.reset_type == 'R':
+            self.positions[reset] = self.start_positions[reset]
+
+        return crashed, self.finished.copy()
+
+    def get_finish(self):
+        """
+        This function returns each car's finish status
+
+        Returns:
+            flag_finished: numpy bool array (n_cars), each car's current finished status
+        """
+        return self.finished | (self.time >= self.max_steps)
@@ -0,0 +1,81 @@
+from time import perf_counter
+
+
+class Watchdog:
+    """
+    Class Watchdog which stops a run that is over its wall clock budget or has stalled
+
+    The step budget is kept by the car itself, see Car.max_steps. The watchdog is checked after every step. It keeps a
+        rolling window of the hashes of the car's recent (position, velocity) states, with a count of each hash, so the
+        number of distinct states in the window is known at the cost of a couple of dict updates per step. A car that
+        keeps visiting only a handful of states, for example one stuck against a wall or circling a bend, is stopped as
+        stalled. The clock is only read every check_steps steps.
+    """
+    def __init__(self, car, max_seconds=None, stall_window=0, stall_states=20, check_steps=1024):
+        """
+        Init function, takes the car to watch and the budgets
+
+        Args:
+            car: car, car object being driven
+            max_seconds: float, optional wall clock budget of the run in seconds. Defaults to none
+            stall_window: int, number of recent steps to look for a stall in. Defaults to 0, no stall detection
+            stall_states: int, the car is stalled when its last stall_window steps visited this many distinct states or
+                fewer. Defaults to 20
+            check_steps: int, number of steps between reads of the clock
+        """
+        self.car = car
+        self.max_seconds = max_seconds
+        self.stall_window = stall_window
+        self.stall_states = stall_states
+        self.check_steps = check_steps
+
+        # Wall clock
+        self.start_time = None
+        self.steps = 0
+
+        # Rolling window of state hashes, written in a ring, and the count of each hash in the window
+        self.window = [None] * stall_window
+        self.window_index = 0
+        self.window_counts = {}
+
+    def start(self):
+        """
+        This function starts the wall clock and clears the window, call before the first step
+        """
+        self.start_time = perf_counter()
+        self.steps = 0
+        self.window = [None] * self.stall_window
+        self.window_index = 0
+        self.window_counts = {}
+
+    def check(self):
+        """
+        This function checks the car after a step, and stops it if it is over the wall clock budget or has stalled
+        """
+        self.steps += 1
+
+        # Wall clock budget
+        if self.max_seconds is not None and self.steps % self.check_steps == 0:
+            if perf_counter() - self.start_time > self.max_seconds:
+                self.car.stop('time_budget')
+                return
+
+        if not self.stall_window:
+            return
+
+        # Move the window along, replacing the oldest state hash with the newest
+        state = hash((self.car.position, self.car.velocity))
+        counts = self.window_counts
+        oldest = self.window[self.window_index]
+        if oldest is not None:
+            if counts[oldest] == 1:
+                del counts[oldest]
+            else:
+                counts[oldest] -= 1
+        counts[state] = counts.get(state, 0) + 1
+        self.window[self.window_index] = state
+        self.window_index = (self.window_index + 1) % self.stall_window
+
+        # Stalled once a full window holds too few distinct states
+        if self.steps >= self.stall_window and len(counts) <= self.stall_states:
+            self.car.stop('stalled')
@@ -0,0 +1,78 @@
+from utils.args import replay_args
+from objects.track import Track
+from objects.recorder import load_steps
+import numpy as np
+
+
+def replay():
+    """
+    Replay function to rebuild a recorded run without simulating it again
+
+    Prints every recorded step in the same format as the tracer, or draws the positions the car visited onto the track.
+        See utils.args.replay_args for the arguments
+    """
+    # Parse arguments
+    arguments = replay_args()
+
+    steps = load_steps(arguments.record_directory)
+
+    if arguments.draw:
+        for line in draw_track(Track(arguments.track_name), steps):
+            print(line)
+    else:
+        for line in get_step_lines(steps):
+            print(line)
+
+
+def get_step_lines(steps):
+    """
+    Function to describe every recorded step in the same format as the tracer
+
+    Args:
+        steps: dict, numpy array of each field keyed by name, see objects.recorder.load_steps
+
+    Returns:
+        lines: list str, a line per step
+    """
+    # Convert each field to lists of plain ints once
+    fields = {name: values.tolist() for name, values in steps.items()}
+
+    lines = []
+    for time, position, velocity, requested_acceleration, acceleration, crashed, finished in zip(
+            fields['time'], fields['position'], fields['velocity'], fields['requested_acceleration'],
+            fields['acceleration'], fields['crashed'], fields['finished']):
+        # An acceleration failed if it was requested and not applied
+        status = tuple(bool(requested == 0 or applied != 0)
+                       for requested, applied in zip(requested_acceleration, acceleration))
+
+        lines.append(f'Time: {time}, Requested: {tuple(requested_acceleration)}, Acceleration: {tuple(acceleration)}, '
+                     f'Status: {status}, Velocity: {tuple(velocity)}, Crashed: {crashed}, Finished: {finished}, '
+                     f'Position: {tuple(position)}')
+
+    return lines
+
+
+def draw_track(track, steps):
+    """
+    Function to draw the positions visited by the car onto the track. Visited positions are marked with 'o', and
+        positions where the car crashed with 'x'
+
+    Args:
+        track: track, track object the run was recorded on
+        steps: dict, numpy array of each field keyed by name, see objects.recorder.load_steps
+
+    Returns:
+        lines: list str, a line per row of the track
+    """
+    grid = np.array(list(track.TRACK_TYPES))[track.get_track_grid()]
+
+    positions = np.asarray(steps['position'])
+    crashed = np.asarray(steps['crashed'])
+    grid[positions[:, 0], positions[:, 1]] = 'o'
+    grid[positions[crashed, 0], positions[crashed, 1]] = 'x'
+
+    return [''.join(row) for row in grid]
+
+
+if __name__ == '__main__':
+    replay()
@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.args import scaling_args
+from objects.track import Track
+from objects.car import Car
+from objects.driver import Driver
+from objects.random_stream import spawn_streams
+from objects.track_generator import generate_track, write_track
+import json
+import os
+import random
+import time
+import tracemalloc
+
+
+def scaling():
+    """
+    Scaling function to benchmark a track, car and driver on generated tracks of growing size
+
+    For each size a square track is generated into data, if it is not there already, and measured in fresh processes:
+        the time to load the track, build the movement table and run value iteration, the steps per second of driving
+        on it, and the peak memory allocated before driving. A size that runs out of memory is reported as failed and
+        the sizes after it still run. See utils.args.scaling_args for the arguments
+    """
+    # Parse arguments
+    arguments = scaling_args()
+
+    results = []
+    print('Size, Load (s), Movement table (s), Value iteration (s), Peak memory (MB), Steps per second')
+    for size in arguments.sizes:
+        # Generate the track once for these settings
+        track_name = f'G{size}_{arguments.corridor_width}_{arguments.turns}_{arguments.random_seed}'
+        file_location = f'data//{track_name}-track.txt'
+        if not os.path.exists(file_location):
+            grid = generate_track(size, size, arguments.corridor_width, arguments.turns,
+                                  random.Random(arguments.random_seed))
+            write_track(file_location, grid)
+
+        # Measure in fresh processes, so the memory of each size is its own. Memory is traced separately as tracing
+        # slows down the timed phases
+        try:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(measure_track, track_name, arguments.value_engine, arguments.steps,
+                                         arguments.random_seed, arguments.value_init).result()
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result['peak_bytes'] = executor.submit(measure_memory, track_name, arguments.value_engine,
+                                                       arguments.random_seed, arguments.value_init).result()
+        except (MemoryError, BrokenProcessPool) as error:
+            print(f'{size}, failed: {type(error).__name__}')
+            results.append({'size': size, 'track_name': track_name, 'error': type(error).__name__})
+            continue
+
+        print(f'{size}, {result["load_seconds"]:.3f}, {result["movement_seconds"]:.3f}, '
+              f'{result["value_seconds"]:.3f}, {result["peak_bytes"] / 1024 ** 2:.1f}, '
+              f'{result["steps_per_second"]:.0f}')
+        results.append({'size': size, **result})
+
+    # Save the results
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+
+def measure_track(track_name, value_engine, steps, random_seed, value_init='zeros'):
+    """
+    Function to time a single track in a worker process
+
+    Args:
+        track_name: str, name of the track in data
+        value_engine: str, value iteration engine for the driver
+        steps: int, number of steps to drive. The car is put back on the start line whenever it finishes
+        random_seed: int, random seed for the car and the driver
+        value_init: str, starting values of value iteration for the driver
+
+    Returns:
+        result: dict, track_name, load_seconds, movement_seconds, value_seconds and steps_per_second
+    """
+    car_stream, driver_stream = spawn_streams(random_seed)
+
+    # Load the track
+    start = time.perf_counter()
+    track = Track(track_name)
+    load_seconds = time.perf_counter() - start
+
+    # Build the movement table, otherwise it is built on the first step
+    start = time.perf_counter()
+    track.get_movement_table()
+    movement_seconds = time.perf_counter() - start
+
+    # Run value iteration, including building the driver's action selection table
+    car = Car(track, rng=car_stream)
+    start = time.perf_counter()
+    driver = Driver(car, value_engine=value_engine, rng=driver_stream, value_init=value_init)
+    value_seconds = time.perf_counter() - start
+
+    # Drive
+    start = time.perf_counter()
+    for _ in range(steps):
+        if car.get_finish():
+            car.restart()
+        driver.accelerate_car()
+    steps_per_second = steps / (time.perf_counter() - start)
+
+    return {
+        'track_name': track_name,
+        'load_seconds': load_seconds,
+        'movement_seconds': movement_seconds,
+        'value_seconds': value_seconds,
+        'steps_per_second': steps_per_second
+    }
+
+
+def measure_memory(track_name, value_engine, random_seed, value_init='zeros'):
+    """
+    Function to trace the peak memory allocated by loading a single track, building its movement table and running
+        value iteration, in a worker process
+
+    Args:
+        track_name: str, name of the track in data
+        value_engine: str, value iteration engine for the driver
+        random_seed: int, random seed for the car
+        value_init: str, starting values of value iteration for the driver
+
+    Returns:
+        peak_bytes: int, peak memory allocated in bytes
+    """
+    car_stream, driver_stream = spawn_streams(random_seed)
+    tracemalloc.start()
+
+    track = Track(track_name)
+    track.get_movement_table()
+    Driver(Car(track, rng=car_stream), value_engine=value_engine, rng=driver_stream, value_init=value_init)
+
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak_bytes
+
+
+if __name__ == '__main__':
+    scaling()
@@ -0,0 +1,159 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from utils.args import args, sweep_args
+from objects.track import Track
+from objects.car import Car
+from objects.driver import Driver
+from objects.random_stream import RandomStream
+from objects.results import ResultStore
+from objects.value_cache import ValueCache
+from objects.shared_values import SharedValues, attach_values, get_values_key
+from main import run
+import os
+import sys
+
+# Value matrices attached by this worker process, keyed by get_values_key
+WORKER_VALUES = {}
+
+
+def sweep():
+    """
+    Sweep function to run every combination of tracks, reset types, brain types, learning rates and seeds
+
+    Runs are spread across a pool of worker processes. The value matrix of each track is solved once here and shared
+        with the workers. Results are collected here and added to the results store in batches. See
+        utils.args.sweep_args for the arguments
+    """
+    # Parse arguments
+    arguments = sweep_args()
+
+    # Every combination of the grid, one run each
+    experiments = [
+        {
+            'random_seed': random_seed,
+            'track_name': track_name,
+            'reset_type': reset_type,
+            'brain_type': brain_type,
+            'learning_rate': learning_rate,
+            'discount_rate': arguments.discount_rate,
+            'convergence_delta': arguments.convergence_delta,
+            'value_engine': arguments.value_engine,
+            'value_init': arguments.value_init,
+            'step_budget': arguments.step_budget,
+            'time_budget': arguments.time_budget,
+            'stall_window': arguments.stall_window,
+            'stall_states': arguments.stall_states
+        }
+        for track_name, reset_type, brain_type, learning_rate, random_seed in product(
+            arguments.track_names, arguments.reset_types, arguments.brain_types, arguments.learning_rates,
+            range(arguments.first_seed, arguments.first_seed + arguments.seeds))
+    ]
+
+    # Solve and publish the value matrix of each track. The shared value matrices and the results store are closed
+    # even if a run breaks the pool or a batch fails to save, so no shared memory is left behind
+    shared_values = SharedValues()
+    try:
+        for track_name in arguments.track_names:
+            publish_values(shared_values, track_name, arguments)
+
+        # Spread the runs across the pool, writing results as each batch fills up
+        result_store = ResultStore(arguments.results_file)
+        try:
+            rows = []
+            completed = 0
+            failed = 0
+            workers = arguments.workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers, initializer=attach_worker,
+                                     initargs=(shared_values.get_descriptors(),)) as executor:
+                futures = [executor.submit(run_experiment, experiment) for experiment in experiments]
+
+                for future in as_completed(futures):
+                    row = future.result()
+                    completed += 1
+
+                    if row is None:
+                        failed += 1
+                    else:
+                        rows.append(row)
+
+                    # Write a full batch
+                    if len(rows) >= arguments.batch_size:
+                        result_store.save(rows)
+                        rows = []
+                        print(f'Completed {completed} of {len(experiments)} runs')
+
+            # Write the rest
+            if rows:
+                result_store.save(rows)
+            print(f'Completed {completed} of {len(experiments)} runs, {failed} failed')
+
+        finally:
+            result_store.close()
+
+    finally:
+        # Remove the shared value matrices
+        shared_values.close()
+
+
+def publish_values(shared_values, track_name, arguments):
+    """
+    Function to run value iteration for a track and publish the result into shared memory
+
+    Args:
+        shared_values: SharedValues, where to publish the value matrix
+        track_name: char, letter of track to solve
+        arguments: namespace, parsed sweep arguments with the value iteration parameters
+    """
+    # The car only places the driver on the track, give it a fixed stream so every sweep publishes the same values
+    car = Car(Track(track_name), rng=RandomStream(0))
+    value_cache = ValueCache(arguments.value_cache) if arguments.value_cache else None
+    driver = Driver(car, discount_rate=arguments.discount_rate, convergence_delta=arguments.convergence_delta,
+                    value_engine=arguments.value_engine, value_cache=value_cache, value_init=arguments.value_init)
+
+    key = get_values_key(track_name, arguments.discount_rate, arguments.convergence_delta, arguments.value_engine,
+                         arguments.value_init)
+    shared_values.publish(key, driver.values)
+
+
+def attach_worker(descriptors):
+    """
+    Function to attach a worker process to every published value matrix when it starts
+
+    Args:
+        descriptors: dict, descriptor of each value matrix keyed by get_values_key
+    """
+    for key, descriptor in descriptors.items():
+        WORKER_VALUES[key] = attach_values(descriptor)
+
+
+def run_experiment(experiment):
+    """
+    Function to drive a single run of the sweep in a worker process
+
+    Args:
+        experiment: dict, values for the arguments of main, see utils.args.args
+
+    Returns:
+        row: tuple, the run's row for the results store, or None if the run raised an error
+    """
+    # Start from the default arguments and apply the experiment
+    arguments = args([])
+    for key, value in experiment.items():
+        setattr(arguments, key, value)
+
+    # Shared value matrix for this track, if one was published
+    key = get_values_key(arguments.track_name, arguments.discount_rate, arguments.convergence_delta,
+                         arguments.value_engine, arguments.value_init)
+    values = WORKER_VALUES[key][0] if key in WORKER_VALUES else None
+
+    try:
+        driver = run(arguments, values)
+    except Exception as error:
+        print(f'Run {experiment} failed: {error!r}', file=sys.stderr)
+        return None
+
+    return driver.get_summary(arguments.random_seed)
+
+
+if __name__ == '__main__':
+    sweep()
@@ -0,0 +1,48 @@
+from utils.args import train_args
+from objects.track import Track
+from objects.car import Car
+from objects.learner import QLearner
+from objects.random_stream import spawn_streams
+
+
+def train():
+    """
+    Train function to learn a dense action value tensor over many episodes in one process
+
+    Prints the memory footprint of the tensor, the update throughput and how the episode times changed. See
+        utils.args.train_args for the arguments
+    """
+    # Parse arguments
+    arguments = train_args()
+
+    # Independent random number streams for the car and learner, derived from the seed alone
+    car_stream, learner_stream = spawn_streams(arguments.random_seed)
+
+    # Create Track and Car
+    track = Track(arguments.track_name)
+    car = Car(track, arguments.reset_type, rng=car_stream)
+
+    # Create Learner
+    kwargs = {
+        'car': car,
+        'brain_type': arguments.brain_type,
+        'learning_rate': arguments.learning_rate,
+        'discount_rate': arguments.discount_rate,
+        'epsilon': arguments.epsilon,
+        'rng': learner_stream
+    }
+    learner = QLearner(**kwargs)
+
+    # Train and report
+    report = learner.train(arguments.episodes)
+    times = report['times']
+    window = max(1, len(times) // 10)
+
+    print(f'Action values: {learner.q_values.shape} float32, {report["memory_bytes"] / 1024 ** 2:.2f} MB')
+    print(f'Updates: {report["updates"]}, {report["updates_per_second"]:.0f} per second')
+    print(f'Mean time of the first {window} episodes: {sum(times[:window]) / window:.1f}')
+    print(f'Mean time of the last {window} episodes: {sum(times[-window:]) / window:.1f}')
+
+
+if __name__ == '__main__':
+    train()
@@ -1,13 +1,17 @@
 import argparse
+import os
 
 
-def args():
+def args(argv=None):
     """
     Function to create command line arguments
 
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
     Arguments:
         -rs <int>, --random_seed <int>
-            Random seed for testing, seeds the rate of failed accelerations
+            Random seed for testing, seeds the random number streams of the car and driver
         -t <char>, --track_name <char>
             Track letter to use as the track. Please use: 'R', 'O', or 'L'. Capitalization matters
             <R> r-track
@@ -18,37 +22,435 @@ def args():
             <S> stop, resets velocity, increases time, but doesn't move car
             <R> reset, resets velocity, increases time, moves car back to start
         -bt <char>, --brain_type <char>
-            Learning type, Q = QLearning, S = SARSA. Please use: 'Q', 'S'. Capitalization matters
+            Learning type, Q = QLearning, S = SARSA, D = DynaQ, P = Planner. Please use: 'Q', 'S', 'D', 'P'.
+            Capitalization matters
             <Q> QLearning
             <S> SARSA
+            <D> DynaQ, QLearning with prioritized sweeping over the observed transitions
+            <P> Planner, the best action of value iteration over every (x, y, vx, vy) state, no learning
         -dr <float>, --discount_rate <float>
             Discount rate in Bellman's equation for value iteration
         -cd <float>, --convergence_delta <float>
             Convergence delta for value iteration
         -lr <float>, --learning_rate <float>
             Rate of learning for Reinforcement learning
+        -ps <int>, --planning_steps <int>
+            Number of simulated updates from the model after each step, for DynaQ
+        -ve <str>, --value_engine <str>
+            Value iteration engine. Please use: 'numpy', 'loop', 'priority'
+            <numpy> vectorized sweeps over the whole track
+            <loop> cell by cell loop
+            <priority> prioritized backups spreading out from the finish line
+        -vi <str>, --value_init <str>
+            Starting values of value iteration. Please use: 'zeros', 'distance'
+            <zeros> 0 everywhere
+            <distance> the discounted step distance of every position from the finish line
+        -vc <str>, --value_cache <str>
+            Directory to cache converged value matrices in, value iteration is skipped when the matrix is cached
+        -tl <int>, --trace_level <int>
+            Trace level for the car. Please use: 0, 1, 2
+            <0> off
+            <1> a line per step
+            <2> a line per step, including the positions and track types passed over
+        -ts <int>, --trace_steps <int>
+            Number of the most recent traced steps to keep in memory for crash debugging
+        -tf <str>, --trace_file <str>
+            File to write every traced step to
+        -mf <str>, --metrics_file <str>
+            File to write a snapshot of the runtime metrics to when the run ends
+        -mt <str>, --metrics_format <str>
+            Format of the metrics snapshot. Please use: 'json', 'prometheus'
+        -ms <int>, --metrics_steps <int>
+            Number of steps between metrics snapshots while driving. Defaults to 0, only at the end
+        -rc <str>, --record_directory <str>
+            Directory to save the trajectory of the run to, a .npy file per field
+        -re, --record_delta
+            Delta encode the time and positions of the saved trajectory
+        -rf <str>, --results_file <str>
+            SQLite database to add the result of the run to
+        -sb <int>, --step_budget <int>
+            Number of steps after which the run is stopped with the status step_budget
+        -tb <float>, --time_budget <float>
+            Seconds of driving after which the run is stopped with the status time_budget
+        -sw <int>, --stall_window <int>
+            Number of recent steps to look for a stall in, the run is stopped with the status stalled. Defaults to 0,
+            off
+        -ss <int>, --stall_states <int>
+            The car is stalled when its last stall_window steps visited this many distinct states or fewer
     """
     # Initialize the parser
     parser = argparse.ArgumentParser()
 
     # Add arguments
     parser.add_argument('-rs', '--random_seed', type=int,
-                        help="Set a random seed for testing, seeds the rate of failed accelerations")
+                        help="Set a random seed for testing, seeds the random number streams of the car and driver")
     parser.add_argument('-t', '--track_name', type=str,
                         help="Track letter to use as the track. Please use: 'R', 'O', or 'L'. Capitalization matters")
     parser.add_argument('-rt', '--reset_type', type=str, default='S',
                         help="Reset type for crash, S = stop, R = reset. Please use: 'S', 'R'. Capitalization matters")
     parser.add_argument('-bt', '--brain_type', type=str, default='Q',
-                        help="Learning type, Q = QLearning, S = SARSA. Please use: 'Q', 'S'. Capitalization matters")
+                        help="Learning type, Q = QLearning, S = SARSA, D = DynaQ, P = Planner. "
+                             "Please use: 'Q', 'S', 'D', 'P'. Capitalization matters")
     parser.add_argument('-dr', '--discount_rate', type=float, default=.9,
                         help="Discount rate in Bellman's equation for value iteration")
     parser.add_argument('-cd', '--convergence_delta', type=float, default=.001,
                         help="Convergence delta for value iteration")
     parser.add_argument('-lr', '--learning_rate', type=float, default=.01,
                         help="Learning rate of value update from QLearning and SARSA")
+    parser.add_argument('-ps', '--planning_steps', type=int, default=10,
+                        help="Number of simulated updates from the model after each step, for DynaQ")
+    parser.add_argument('-ve', '--value_engine', type=str, default='numpy',
+                        help="Value iteration engine. Please use: 'numpy', 'loop', 'priority'")
+    parser.add_argument('-vi', '--value_init', type=str, default='zeros',
+                        help="Starting values of value iteration. Please use: 'zeros', 'distance'")
+    parser.add_argument('-vc', '--value_cache', type=str,
+                        help="Directory to cache converged value matrices in")
+    parser.add_argument('-tl', '--trace_level', type=int, default=0,
+                        help="Trace level for the car. Please use: 0 = off, 1 = step, 2 = detail")
+    parser.add_argument('-ts', '--trace_steps', type=int, default=1000,
+                        help="Number of the most recent traced steps to keep in memory for crash debugging")
+    parser.add_argument('-tf', '--trace_file', type=str,
+                        help="File to write every traced step to")
+    parser.add_argument('-mf', '--metrics_file', type=str,
+                        help="File to write a snapshot of the runtime metrics to when the run ends")
+    parser.add_argument('-mt', '--metrics_format', type=str, default='json',
+                        help="Format of the metrics snapshot. Please use: 'json', 'prometheus'")
+    parser.add_argument('-ms', '--metrics_steps', type=int, default=0,
+                        help="Number of steps between metrics snapshots while driving")
+    parser.add_argument('-rc', '--record_directory', type=str,
+                        help="Directory to save the trajectory of the run to")
+    parser.add_argument('-re', '--record_delta', action='store_true',
+                        help="Delta encode the time and positions of the saved trajectory")
+    parser.add_argument('-rf', '--results_file', type=str, default='output//results.db',
+                        help="SQLite database to add the result of the run to")
+    parser.add_argument('-sb', '--step_budget', type=int, default=200000,
+                        help="Number of steps after which the run is stopped")
+    parser.add_argument('-tb', '--time_budget', type=float,
+                        help="Seconds of driving after which the run is stopped")
+    parser.add_argument('-sw', '--stall_window', type=int, default=0,
+                        help="Number of recent steps to look for a stall in. Defaults to 0, off")
+    parser.add_argument('-ss', '--stall_states', type=int, default=20,
+                        help="The car is stalled when its last stall_window steps visited this many distinct states or "
+                             "fewer")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def sweep_args(argv=None):
+    """
+    Function to create command line arguments for a sweep of runs
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -t <char> [<char> ...], --track_names <char> [<char> ...]
+            Track letters to sweep over. Defaults to: R O L
+        -rt <char> [<char> ...], --reset_types <char> [<char> ...]
+            Reset types to sweep over. Defaults to: S R
+        -bt <char> [<char> ...], --brain_types <char> [<char> ...]
+            Learning types to sweep over. Defaults to: Q S
+        -lr <float> [<float> ...], --learning_rates <float> [<float> ...]
+            Learning rates to sweep over. Defaults to: .01
+        -s <int>, --seeds <int>
+            Number of random seeds to run for each configuration, counting up from the first seed
+        -fs <int>, --first_seed <int>
+            First random seed of the sweep
+        -dr <float>, --discount_rate <float>
+            Discount rate in Bellman's equation for value iteration
+        -cd <float>, --convergence_delta <float>
+            Convergence delta for value iteration
+        -ve <str>, --value_engine <str>
+            Value iteration engine. Please use: 'numpy', 'loop', 'priority'
+        -vi <str>, --value_init <str>
+            Starting values of value iteration. Please use: 'zeros', 'distance'
+        -vc <str>, --value_cache <str>
+            Directory to cache converged value matrices in, value iteration is skipped when the matrix is cached
+        -w <int>, --workers <int>
+            Number of worker processes. Defaults to the number of cores
+        -bs <int>, --batch_size <int>
+            Number of results to collect before writing them to the results store in a single transaction
+        -rf <str>, --results_file <str>
+            SQLite database to add the results of the runs to
+        -sb <int>, --step_budget <int>
+            Number of steps after which a run is stopped with the status step_budget
+        -tb <float>, --time_budget <float>
+            Seconds of driving after which a run is stopped with the status time_budget
+        -sw <int>, --stall_window <int>
+            Number of recent steps to look for a stall in, a run is stopped with the status stalled. Defaults to 0, off
+        -ss <int>, --stall_states <int>
+            A car is stalled when its last stall_window steps visited this many distinct states or fewer
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-t', '--track_names', type=str, nargs='+', default=['R', 'O', 'L'],
+                        help="Track letters to sweep over. Please use: 'R', 'O', or 'L'. Capitalization matters")
+    parser.add_argument('-rt', '--reset_types', type=str, nargs='+', default=['S', 'R'],
+                        help="Reset types to sweep over. Please use: 'S', 'R'. Capitalization matters")
+    parser.add_argument('-bt', '--brain_types', type=str, nargs='+', default=['Q', 'S'],
+                        help="Learning types to sweep over. Please use: 'Q', 'S', 'D', 'P'. Capitalization matters")
+    parser.add_argument('-lr', '--learning_rates', type=float, nargs='+', default=[.01],
+                        help="Learning rates to sweep over")
+    parser.add_argument('-s', '--seeds', type=int, default=10,
+                        help="Number of random seeds to run for each configuration")
+    parser.add_argument('-fs', '--first_seed', type=int, default=1,
+                        help="First random seed of the sweep")
+    parser.add_argument('-dr', '--discount_rate', type=float, default=.9,
+                        help="Discount rate in Bellman's equation for value iteration")
+    parser.add_argument('-cd', '--convergence_delta', type=float, default=.001,
+                        help="Convergence delta for value iteration")
+    parser.add_argument('-ve', '--value_engine', type=str, default='numpy',
+                        help="Value iteration engine. Please use: 'numpy', 'loop', 'priority'")
+    parser.add_argument('-vi', '--value_init', type=str, default='zeros',
+                        help="Starting values of value iteration. Please use: 'zeros', 'distance'")
+    parser.add_argument('-vc', '--value_cache', type=str,
+                        help="Directory to cache converged value matrices in")
+    parser.add_argument('-w', '--workers', type=int,
+                        help="Number of worker processes. Defaults to the number of cores")
+    parser.add_argument('-bs', '--batch_size', type=int, default=100,
+                        help="Number of results to collect before writing them to the results store")
+    parser.add_argument('-rf', '--results_file', type=str, default='output//results.db',
+                        help="SQLite database to add the results of the runs to")
+    parser.add_argument('-sb', '--step_budget', type=int, default=200000,
+                        help="Number of steps after which a run is stopped")
+    parser.add_argument('-tb', '--time_budget', type=float,
+                        help="Seconds of driving after which a run is stopped")
+    parser.add_argument('-sw', '--stall_window', type=int, default=0,
+                        help="Number of recent steps to look for a stall in. Defaults to 0, off")
+    parser.add_argument('-ss', '--stall_states', type=int, default=20,
+                        help="A car is stalled when its last stall_window steps visited this many distinct states or "
+                             "fewer")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def train_args(argv=None):
+    """
+    Function to create command line arguments for training an action value tensor over many episodes
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -rs <int>, --random_seed <int>
+            Random seed for testing, seeds the random number streams of the car and the E-Greedy choices
+        -t <char>, --track_name <char>
+            Track letter to use as the track. Please use: 'R', 'O', or 'L'. Capitalization matters
+        -rt <char>, --reset_type <char>
+            Reset type for crash, S = stop, R = reset. Please use: 'S', 'R'. Capitalization matters
+        -bt <char>, --brain_type <char>
+            Learning type, Q = QLearning, S = SARSA. Please use: 'Q', 'S'. Capitalization matters
+        -dr <float>, --discount_rate <float>
+            Discount rate of future rewards
+        -lr <float>, --learning_rate <float>
+            Rate of learning for Reinforcement learning
+        -ep <float>, --epsilon <float>
+            Chance of picking a random action instead of the best one
+        -e <int>, --episodes <int>
+            Number of episodes to train for
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-rs', '--random_seed', type=int,
+                        help="Set a random seed for testing, seeds the random number streams of the car and the "
+                             "E-Greedy choices")
+    parser.add_argument('-t', '--track_name', type=str, default='R',
+                        help="Track letter to use as the track. Please use: 'R', 'O', or 'L'. Capitalization matters")
+    parser.add_argument('-rt', '--reset_type', type=str, default='S',
+                        help="Reset type for crash, S = stop, R = reset. Please use: 'S', 'R'. Capitalization matters")
+    parser.add_argument('-bt', '--brain_type', type=str, default='Q',
+                        help="Learning type, Q = QLearning, S = SARSA. Please use: 'Q', 'S'. Capitalization matters")
+    parser.add_argument('-dr', '--discount_rate', type=float, default=.9,
+                        help="Discount rate of future rewards")
+    parser.add_argument('-lr', '--learning_rate', type=float, default=.1,
+                        help="Learning rate of the action value update from QLearning and SARSA")
+    parser.add_argument('-ep', '--epsilon', type=float, default=.1,
+                        help="Chance of picking a random action instead of the best one")
+    parser.add_argument('-e', '--episodes', type=int, default=100,
+                        help="Number of episodes to train for")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def generate_args(argv=None):
+    """
+    Function to create command line arguments for generating a track
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -t <str>, --track_name <str>
+            Name of the generated track, it is written to data as <track_name>-track.txt
+        -x <int>, --rows <int>
+            Number of rows of the track
+        -y <int>, --columns <int>
+            Number of columns of the track
+        -cw <int>, --corridor_width <int>
+            Width of the corridor
+        -tn <int>, --turns <int>
+            Number of turns along the corridor
+        -rs <int>, --random_seed <int>
+            Random seed for the corridor layout
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-t', '--track_name', type=str, required=True,
+                        help="Name of the generated track, it is written to data as <track_name>-track.txt")
+    parser.add_argument('-x', '--rows', type=int, default=100,
+                        help="Number of rows of the track")
+    parser.add_argument('-y', '--columns', type=int, default=100,
+                        help="Number of columns of the track")
+    parser.add_argument('-cw', '--corridor_width', type=int, default=5,
+                        help="Width of the corridor")
+    parser.add_argument('-tn', '--turns', type=int, default=4,
+                        help="Number of turns along the corridor")
+    parser.add_argument('-rs', '--random_seed', type=int, default=1,
+                        help="Random seed for the corridor layout")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def scaling_args(argv=None):
+    """
+    Function to create command line arguments for the scaling benchmark
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -sz <int> [<int> ...], --sizes <int> [<int> ...]
+            Rows and columns of the square tracks to benchmark. Defaults to: 100 250 500 1000 2000 4000
+        -cw <int>, --corridor_width <int>
+            Width of the corridor of the generated tracks
+        -tn <int>, --turns <int>
+            Number of turns along the corridor of the generated tracks
+        -st <int>, --steps <int>
+            Number of steps to drive on each track to measure the step rate
+        -ve <str>, --value_engine <str>
+            Value iteration engine. Please use: 'numpy', 'loop', 'priority'
+        -vi <str>, --value_init <str>
+            Starting values of value iteration. Please use: 'zeros', 'distance'
+        -rs <int>, --random_seed <int>
+            Random seed for the corridor layout and the driving
+        -o <str>, --output <str>
+            Optional json file to save the results to
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-sz', '--sizes', type=int, nargs='+', default=[100, 250, 500, 1000, 2000, 4000],
+                        help="Rows and columns of the square tracks to benchmark")
+    parser.add_argument('-cw', '--corridor_width', type=int, default=5,
+                        help="Width of the corridor of the generated tracks")
+    parser.add_argument('-tn', '--turns', type=int, default=8,
+                        help="Number of turns along the corridor of the generated tracks")
+    parser.add_argument('-st', '--steps', type=int, default=10000,
+                        help="Number of steps to drive on each track to measure the step rate")
+    parser.add_argument('-ve', '--value_engine', type=str, default='numpy',
+                        help="Value iteration engine. Please use: 'numpy', 'loop', 'priority'")
+    parser.add_argument('-vi', '--value_init', type=str, default='zeros',
+                        help="Starting values of value iteration. Please use: 'zeros', 'distance'")
+    parser.add_argument('-rs', '--random_seed', type=int, default=1,
+                        help="Random seed for the corridor layout and the driving")
+    parser.add_argument('-o', '--output', type=str,
+                        help="Json file to save the results to")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def benchmark_args(argv=None):
+    """
+    Function to create command line arguments for the benchmark
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -b <str>, --baseline <str>
+            Json file of the baseline metrics. It is created if it does not exist
+        -s, --save
+            Save the results as the new baseline instead of comparing against it
+        -th <float>, --threshold <float>
+            Fraction a metric can be slower than the baseline before it counts as a regression
+        -r <int>, --repeat <int>
+            Number of repeats of each metric, the best one is kept
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-b', '--baseline', type=str, default=os.path.join('output', 'benchmark.json'),
+                        help="Json file of the baseline metrics. It is created if it does not exist")
+    parser.add_argument('-s', '--save', action='store_true',
+                        help="Save the results as the new baseline instead of comparing against it")
+    parser.add_argument('-th', '--threshold', type=float, default=.2,
+                        help="Fraction a metric can be slower than the baseline before it counts as a regression")
+    parser.add_argument('-r', '--repeat', type=int, default=10,
+                        help="Number of repeats of each metric, the best one is kept")
+
+    # Parse arguments
+    command_args = parser.parse_args(argv)
+
+    # Return the parsed arguments
+    return command_args
+
+
+def replay_args(argv=None):
+    """
+    Function to create command line arguments for replaying a recorded run
+
+    Args:
+        argv: list str, optional arguments to parse. Defaults to the command line
+
+    Arguments:
+        -rc <str>, --record_directory <str>
+            Directory the run was recorded to
+        -d, --draw
+            Draw the positions visited onto the track instead of printing every step
+        -t <char>, --track_name <char>
+            Track the run was recorded on, needed to draw
+    """
+    # Initialize the parser
+    parser = argparse.ArgumentParser()
+
+    # Add arguments
+    parser.add_argument('-rc', '--record_directory', type=str, required=True,
+                        help="Directory the run was recorded to")
+    parser.add_argument('-d', '--draw', action='store_true',
+                        help="Draw the positions visited onto the track instead of printing every step")
+    parser.add_argument('-t', '--track_name', type=str, default='R',
+                        help="Track the run was recorded on, needed to draw")
 
     # Parse arguments
-    command_args = parser.parse_args()
+    command_args = parser.parse_args(argv)
 
     # Return the parsed arguments
     return command_args
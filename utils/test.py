@@ -1,5 +1,19 @@
-from objects.bresenham import BresenhamPath
+from objects.aggregator import RunningStats
+from objects.bresenham import BresenhamPath, get_path, walk_path
 from objects.car import Car
+from objects.driver import Driver
+from objects.movement import check_path
+from objects.planner import StateSpacePlanner
+from objects.random_stream import RandomStream
+from objects.results import ResultStore
+from objects.track import Track
+from objects.vector_env import VectorCarEnv
+from objects.watchdog import Watchdog
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import tempfile
+import numpy as np
 
 def bresenham_path_test():
     BresenhamPath((6, 6), (5, 0)).get_positions()
@@ -59,56 +73,266 @@ def bresenham_path_test():
     BresenhamPath((0, 1), (0, 0)).get_positions()
 
 
+def offset_path_test():
+    # The cached offsets must match a BresenhamPath for every displacement, including the order of the positions
+    for start in [(0, 0), (5, 5), (10, 3), (3, 10)]:
+        for dx in range(-5, 6):
+            for dy in range(-5, 6):
+                new_position = (start[0] + dx, start[1] + dy)
+                assert get_path(start, new_position) == BresenhamPath(start, new_position).get_positions()
+
+
+def walk_path_test():
+    # Fixed paths from (10, 10), in every octant, along each diagonal and axis and without moving. These are the paths
+    # of the six Bresenham variants walk_path replaced, so the walk must match them cell for cell, in order
+    expected = {
+        (15, 12): [(10, 10), (11, 10), (12, 11), (13, 11), (14, 12), (15, 12)],
+        (12, 15): [(10, 10), (10, 11), (11, 12), (11, 13), (12, 14), (12, 15)],
+        (8, 15): [(10, 10), (10, 11), (9, 12), (9, 13), (8, 14), (8, 15)],
+        (5, 12): [(5, 12), (6, 12), (7, 11), (8, 11), (9, 10), (10, 10)],
+        (5, 8): [(5, 8), (6, 8), (7, 9), (8, 9), (9, 10), (10, 10)],
+        (8, 5): [(8, 5), (8, 6), (9, 7), (9, 8), (10, 9), (10, 10)],
+        (12, 5): [(12, 5), (12, 6), (11, 7), (11, 8), (10, 9), (10, 10)],
+        (15, 8): [(10, 10), (11, 10), (12, 9), (13, 9), (14, 8), (15, 8)],
+        (13, 13): [(10, 10), (11, 11), (12, 12), (13, 13)],
+        (7, 13): [(7, 13), (8, 12), (9, 11), (10, 10)],
+        (7, 7): [(7, 7), (8, 8), (9, 9), (10, 10)],
+        (13, 7): [(10, 10), (11, 9), (12, 8), (13, 7)],
+        (14, 10): [(10, 10), (11, 10), (12, 10), (13, 10), (14, 10)],
+        (6, 10): [(6, 10), (7, 10), (8, 10), (9, 10), (10, 10)],
+        (10, 14): [(10, 10), (10, 11), (10, 12), (10, 13), (10, 14)],
+        (10, 6): [(10, 6), (10, 7), (10, 8), (10, 9), (10, 10)],
+        (10, 10): [(10, 10)]
+    }
+    for new_position, positions in expected.items():
+        assert list(walk_path((10, 10), new_position)) == positions
+        assert BresenhamPath((10, 10), new_position).get_positions() == positions
+        assert get_path((10, 10), new_position) == positions
+
+
 def car_test(car):
-    # This finishes on random seed 1 on time 40
+    # This finishes on the R track with the stop reset type and RandomStream(1) on time 25, after a single crash
     # Up the leg
+    car.accelerate((-1, -1))
+    car.accelerate((-1, -1))
+    car.accelerate((-1, 1))
     car.accelerate((-1, 0))
-    car.accelerate((-1, 0))
-    car.accelerate((-1, 0))
-    car.accelerate((-1, 0))
-    car.accelerate((-1, 0))
-    car.accelerate((0, 0))
-    car.accelerate((0, 0))
+    car.accelerate((0, 1))
     car.accelerate((0, 0))
 
     # First Curve
-    car.accelerate((0, 1))
     car.accelerate((1, 1))
+    car.accelerate((1, 0))
     car.accelerate((1, 1))
     car.accelerate((1, 1))
-    car.accelerate((0, 0))
 
-    # Around the head
-    car.accelerate((1, -1))
+    # Around the head, braking too late into the wall once
+    car.accelerate((1, 0))
+    car.accelerate((1, 0))
+    car.accelerate((-1, 0))
     car.accelerate((1, -1))
-    car.accelerate((0, -1))
-    car.accelerate((0, -1))
 
     # Around Corner 2
-    car.accelerate((-1, -1))
     car.accelerate((1, -1))
     car.accelerate((-1, -1))
-    car.accelerate((1, 1))
-    car.accelerate((1, -1))
-    car.accelerate((1, 0))
+    car.accelerate((0, 1))
 
     # Around Corner 3 (the bend)
-    car.accelerate((-1, 1))
-    car.accelerate((-1, 1))
     car.accelerate((0, 1))
-    car.accelerate((1, -1))
-    car.accelerate((1, 1))
     car.accelerate((0, 1))
-    car.accelerate((-1, 1))
     car.accelerate((0, 1))
-    car.accelerate((1, 0))
-    car.accelerate((1, 0))
+    car.accelerate((1, 1))
 
     # Around Corner 4 to finish
-    car.accelerate((1, 1))
-    car.accelerate((-1, 1))
-    car.accelerate((-1, 1))
-    car.accelerate((1, -1))
-    car.accelerate((1, -1))
-    car.accelerate((1, -1))
+    car.accelerate((0, 0))
     car.accelerate((1, -1))
+    car.accelerate((0, -1))
+    car.accelerate((0, -1))
+
+
+def planner_test(car):
+    # Drives the car using the best action from the full state space planner, finishes in about 30 steps on the R track
+    planner = StateSpacePlanner(car)
+    planner.value_iteration()
+
+    while not car.get_finish():
+        car.accelerate(planner.get_action(car.get_position(), car.get_velocity()))
+
+    # The Planner brain type must drive the same way
+    driver_car = Car(car.track, car.reset_type, rng=RandomStream(0))
+    driver = Driver(driver_car, brain_type='P')
+    planner_car = Car(car.track, car.reset_type, rng=RandomStream(0))
+    while not driver_car.get_finish():
+        driver.accelerate_car()
+        planner_car.accelerate(planner.get_action(planner_car.get_position(), planner_car.get_velocity()))
+        assert driver_car.get_position() == planner_car.get_position()
+    assert planner_car.get_finish()
+
+    # After a restart on a new start position, the planner must match one solved for that start position
+    restart_car = Car(car.track, 'R', rng=RandomStream(0))
+    restart_planner = StateSpacePlanner(restart_car)
+    restart_planner.value_iteration()
+    while restart_car.start_position == restart_planner.start_position:
+        restart_car.restart()
+    restart_planner.set_start_position(restart_car.start_position)
+
+    solved_planner = StateSpacePlanner(restart_car)
+    solved_planner.value_iteration()
+    tolerance = 2 * solved_planner.convergence_delta / (1 - solved_planner.discount_rate)
+    assert np.abs(restart_planner.values - solved_planner.values).max() <= tolerance
+
+
+def vector_env_test(track, reset_type='S', n_cars=10, steps=200):
+    # Every car in the environment must follow the same trajectory as a standalone car with the same seed and actions
+    env = VectorCarEnv(track, reset_type, n_cars, [RandomStream(seed) for seed in range(n_cars)])
+    cars = [Car(track, reset_type, rng=RandomStream(seed)) for seed in range(n_cars)]
+    actions = random.Random(n_cars)
+
+    for _ in range(steps):
+        accelerations = [(actions.randint(-1, 1), actions.randint(-1, 1)) for _ in range(n_cars)]
+        env.step(accelerations)
+
+        for index, car in enumerate(cars):
+            if not car.get_finish():
+                car.accelerate(accelerations[index])
+            assert tuple(env.positions[index]) == car.get_position()
+            assert tuple(env.velocities[index]) == car.get_velocity()
+            assert env.time[index] == car.get_time()
+
+
+def value_engine_test(track_name):
+    # Every engine must reach the same values, prints the backups each one made for comparison
+    values = None
+    for value_engine in ['numpy', 'loop', 'priority']:
+        for value_init in ['zeros', 'distance']:
+            driver = Driver(Car(Track(track_name), rng=RandomStream(0)), value_engine=value_engine,
+                            value_init=value_init)
+            print(f'{track_name} track, {value_engine} engine, {value_init} init: {driver.backups} backups')
+
+            if values is not None:
+                assert np.abs(driver.values - values).max() <= driver.convergence_delta
+            values = driver.values
+
+
+def shared_values_test(track_name, steps=100):
+    # A shared matrix must only be read until the first update, and never be changed by learning
+    values = Driver(Car(Track(track_name), rng=RandomStream(0))).values.copy()
+    values.flags.writeable = False
+    for brain_type in ['Q', 'S', 'D', 'P']:
+        driver = Driver(Car(Track(track_name), rng=RandomStream(0)), brain_type=brain_type, values=values,
+                        rng=RandomStream(1))
+        assert driver.values is values and driver.padded_values is None
+
+        for _ in range(steps):
+            driver.accelerate_car()
+        assert (driver.values is values) == (brain_type == 'P')
+    assert np.array_equal(values, Driver(Car(Track(track_name), rng=RandomStream(0))).values)
+
+
+def save_results(file_location, seed, n_rows):
+    # Adds rows of a single seed to the results store, in batches of 10
+    result_store = ResultStore(file_location)
+    rows = [(seed, 'R', 'Stop_Reset', 'QLearning', .01, .9, time, 'finished') for time in range(n_rows)]
+    for start in range(0, n_rows, 10):
+        result_store.save(rows[start:start + 10])
+    result_store.close()
+
+
+def result_store_test(n_processes=4, n_rows=200):
+    # Rows written by many processes at once must all be kept, and the aggregates must match the rows
+    with tempfile.TemporaryDirectory() as directory:
+        file_location = os.path.join(directory, 'results.db')
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            for future in [executor.submit(save_results, file_location, seed, n_rows) for seed in range(n_processes)]:
+                future.result()
+
+        result_store = ResultStore(file_location)
+        results = result_store.query(['Seed', 'Time'])
+        assert len(results['Time']) == n_processes * n_rows
+        assert sorted(results['Seed'].tolist()) == sorted(list(range(n_processes)) * n_rows)
+
+        groups = result_store.aggregate(['Seed'], Track_Name='R')
+        assert groups['Runs'].tolist() == [n_rows] * n_processes
+        assert np.allclose(groups['Mean_Time'], (n_rows - 1) / 2)
+        assert groups['Max_Time'].tolist() == [n_rows - 1] * n_processes
+
+        # Every batch of every process was merged into the single configuration's summary
+        statistics = result_store.get_statistics()
+        assert statistics['Runs'].tolist() == [n_processes * n_rows]
+        assert np.isclose(statistics['Mean_Time'][0], results['Time'].mean())
+        assert np.isclose(statistics['Std_Time'][0], results['Time'].std(ddof=1))
+
+        # A run stopped early is left out of both the aggregate and the statistics, unless every status is asked for
+        result_store.save([(0, 'R', 'Stop_Reset', 'QLearning', .01, .9, 200000, 'step_budget')])
+        groups = result_store.aggregate()
+        assert groups['Runs'].tolist() == statistics['Runs'].tolist() == result_store.get_statistics()['Runs'].tolist()
+        assert np.isclose(groups['Mean_Time'][0], statistics['Mean_Time'][0])
+        groups = result_store.aggregate(['Status'], status=None)
+        assert groups['Status'].tolist() == ['finished', 'step_budget']
+        assert groups['Runs'].tolist() == [n_processes * n_rows, 1]
+        result_store.close()
+
+
+def running_stats_test(n_values=10000, n_parts=7):
+    # Summaries merged from parts of a stream must match the whole stream, with quantiles within the relative accuracy
+    values = np.random.default_rng(0).lognormal(5, 1, n_values).round() + 1
+    whole = RunningStats()
+    for value in values:
+        whole.add(value)
+
+    merged = RunningStats()
+    for part in np.array_split(values, n_parts):
+        running_stats = RunningStats()
+        for value in part:
+            running_stats.add(value)
+        merged.merge(RunningStats.from_dict(running_stats.to_dict()))
+
+    for running_stats in [whole, merged]:
+        assert running_stats.count == n_values
+        assert np.isclose(running_stats.mean, values.mean())
+        assert np.isclose(running_stats.get_variance(), values.var(ddof=1))
+        assert running_stats.minimum == values.min() and running_stats.maximum == values.max()
+        for quantile in [.01, .5, .9, .99]:
+            exact = np.quantile(values, quantile, method='inverted_cdf')
+            assert abs(running_stats.get_quantile(quantile) - exact) <= running_stats.relative_accuracy * exact
+
+    # Quantiles are by nearest rank, so the high quantiles of a few values are not the minimum
+    few = RunningStats()
+    for value in [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000]:
+        few.add(value)
+    for quantile, exact in [(0, 100), (.5, 500), (.9, 900), (.99, 1000), (1, 1000)]:
+        assert abs(few.get_quantile(quantile) - exact) <= few.relative_accuracy * exact
+
+
+def watchdog_test(track):
+    # A car left idling on the start line is stalled once a full window has passed, and a car out of steps is stopped
+    car = Car(track, rng=RandomStream(0))
+    watchdog = Watchdog(car, stall_window=100, stall_states=5)
+    watchdog.start()
+    while not car.get_finish():
+        car.accelerate((0, 0))
+        watchdog.check()
+    assert car.get_status() == 'stalled' and car.get_time() == 100
+
+    car.restart()
+    assert car.get_status() == 'driving'
+
+    car = Car(track, rng=RandomStream(0), max_steps=50)
+    while not car.get_finish():
+        car.accelerate((0, 0))
+    assert car.get_status() == 'step_budget' and car.get_time() == 50
+
+
+def check_path_test(track):
+    # The early exit walk must agree with the movement table on every movement, and never look at more of the path
+    movement_table = track.get_movement_table()
+    for cell in movement_table.cells:
+        last_position = (int(cell[0]), int(cell[1]))
+        for velocity_x in range(-5, 6):
+            for velocity_y in range(-5, 6):
+                new_position = (last_position[0] + velocity_x, last_position[1] + velocity_y)
+                flag_crashed, flag_finished, cells_checked = check_path(track, last_position, new_position)
+                outcome = movement_table.get_outcome(last_position, (velocity_x, velocity_y))
+
+                assert (flag_crashed, flag_finished, cells_checked) == outcome
+                assert cells_checked <= len(get_path(last_position, new_position))